@@ -0,0 +1,84 @@
+"""
+Compiled kernel for the time-weighted return sub-period loop.
+Numba is optional; without it the same loop runs as plain Python.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to the interpreted loop
+    njit = None
+
+
+def _twr_growth_loop(
+    period_starts_ns: np.ndarray,
+    period_ends_ns: np.ndarray,
+    txn_dates_ns: np.ndarray,
+    cum_qty: np.ndarray,
+    cum_invested: np.ndarray,
+    price_dates_ns: np.ndarray,
+    price_closes: np.ndarray,
+) -> Tuple[float, int]:
+    """
+    Chain the returns of consecutive TWR sub-periods.
+
+    Each sub-period return is (end value - net cash flow) / start value - 1,
+    where values are holdings times the last close on or before the date and
+    the net cash flow covers transactions in (start, end]. Sub-periods with
+    no positive start value or no end price are skipped, as in the Python
+    implementation.
+
+    Args:
+        period_starts_ns: Sub-period start dates as UTC nanoseconds
+        period_ends_ns: Sub-period end dates as UTC nanoseconds
+        txn_dates_ns: Sorted transaction dates as UTC nanoseconds
+        cum_qty: Running quantity held after each transaction
+        cum_invested: Running net amount invested after each transaction
+        price_dates_ns: Sorted price dates as UTC nanoseconds
+        price_closes: Closing prices aligned with price_dates_ns
+
+    Returns:
+        Tuple of (product of 1 + sub-period return, number of sub-periods used)
+    """
+    growth = 1.0
+    used = 0
+    # Start/end scratch values, allocated once and overwritten per sub-period
+    values = np.empty(2)
+    invested = np.empty(2)
+    for k in range(period_starts_ns.shape[0]):
+        for side in range(2):
+            t = period_starts_ns[k] if side == 0 else period_ends_ns[k]
+            # Prefix sums up to the last transaction on or before t
+            last = np.searchsorted(txn_dates_ns, t, side="right") - 1
+            quantity = 0.0
+            invested[side] = 0.0
+            if last >= 0:
+                quantity = cum_qty[last]
+                invested[side] = cum_invested[last]
+            if quantity <= 0:
+                values[side] = 0.0
+                continue
+            idx = np.searchsorted(price_dates_ns, t, side="right") - 1
+            if idx < 0 or np.isnan(price_closes[idx]) or price_closes[idx] == 0.0:
+                values[side] = np.nan  # No price available
+            else:
+                values[side] = quantity * price_closes[idx]
+
+        start_value = values[0]
+        end_value = values[1]
+        if np.isnan(start_value) or start_value <= 0 or np.isnan(end_value):
+            continue
+
+        net_cash_flow = invested[1] - invested[0]
+        growth *= (end_value - net_cash_flow) / start_value
+        used += 1
+    return growth, used
+
+
+twr_growth = _twr_growth_loop
+if njit is not None:
+    # No fastmath: the loop relies on NaN checks to mark missing prices
+    twr_growth = njit(cache=True)(_twr_growth_loop)
@@ -1,4 +1,5 @@
 import os
+from functools import cached_property
 from pathlib import Path
 from typing import Any, List
 
@@ -8,6 +9,11 @@ from pydantic_settings import BaseSettings
 env = Env()
 
 
+def _sanitize_url(url: str) -> str:
+    """Return the host part of a URL, hiding any credentials before '@'."""
+    return url.rsplit("@", 1)[-1] if "@" in url else "***"
+
+
 class Settings(BaseSettings):
     """Application settings."""
 
@@ -105,6 +111,16 @@ class Settings(BaseSettings):
         """Construct Redis URL from components."""
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    @cached_property
+    def db_url_sanitized(self) -> str:
+        """Database URL with credentials stripped, safe for logging."""
+        return _sanitize_url(self.DATABASE_URL)
+
+    @cached_property
+    def redis_url_sanitized(self) -> str:
+        """Redis URL with credentials stripped, safe for logging."""
+        return _sanitize_url(self.REDIS_URL)
+
     class Config:
         env_file = ".env"
         case_sensitive = True
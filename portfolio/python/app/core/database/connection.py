@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import Optional
@@ -58,8 +59,8 @@ async def create_tables():
         # Import all models to ensure they are registered
         from core.database.models.base import Base
 
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables off the event loop so other startup work can overlap
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
         logger.info("Database tables created successfully")
         return True
     except Exception as e:
@@ -67,6 +68,31 @@ async def create_tables():
         return False
 
 
+async def warmup_pool(size: Optional[int] = None) -> int:
+    """Open pooled connections up front so early requests skip connect latency."""
+    size = size or settings.POOL_SIZE
+    # Check out all connections concurrently, then return them to the pool together
+    results = await asyncio.gather(
+        *(asyncio.to_thread(engine.connect) for _ in range(size)),
+        return_exceptions=True,
+    )
+    connections = [
+        result for result in results if not isinstance(result, BaseException)
+    ]
+    for connection in connections:
+        connection.close()
+
+    failed = len(results) - len(connections)
+    if failed:
+        logger.warning(
+            f"Failed to open {failed} of {size} pooled database connections"
+        )
+    logger.info(
+        f"Database connection pool warmed up with {len(connections)} connections"
+    )
+    return len(connections)
+
+
 async def get_db_health() -> dict:
     """Get database health status."""
     try:
@@ -3,13 +3,15 @@ Comprehensive logging configuration for the Portfolia API application.
 Provides structured logging, different log levels, and formatting.
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 # Log levels
 LOG_LEVELS = {
@@ -31,6 +33,21 @@ SIMPLE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 JSON_FORMAT = '{"timestamp": "%(asctime)s", "logger": "%(name)s", "level": "%(levelname)s", "function": "%(funcName)s", "line": %(lineno)d, "message": "%(message)s"}'
 
 
+# Background listener that drains the root queue into the real handlers
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """Flush pending records and stop the background logging listener."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
+
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors for console output."""
 
@@ -101,9 +118,12 @@ def setup_logging(
         log_file_path = Path(log_file)
 
     # Clear existing handlers
+    global _queue_listener
+    _stop_queue_listener()
     root_logger = logging.getLogger()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    handlers: List[logging.Handler] = []
 
     # Set root logger level
     root_logger.setLevel(numeric_level)
@@ -119,7 +139,7 @@ def setup_logging(
             console_formatter = ColoredFormatter(DETAILED_FORMAT)
 
         console_handler.setFormatter(console_formatter)
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     # File handler with rotation
     if enable_file:
@@ -137,7 +157,17 @@ def setup_logging(
             file_formatter = logging.Formatter(DETAILED_FORMAT)
 
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    # Route records through a queue so formatting and I/O run on a background
+    # thread instead of blocking the caller (e.g. the event loop)
+    if handlers:
+        log_queue: queue.Queue = queue.Queue(-1)
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
 
     # Set specific logger levels
     loggers_to_configure = {
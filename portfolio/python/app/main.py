@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 from contextlib import asynccontextmanager
@@ -5,9 +6,10 @@ from contextlib import asynccontextmanager
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from config import settings
-from core.database.connection import create_tables, init_db
+from core.database.connection import create_tables, init_db, warmup_pool
 from core.database.init_db import init_database
 from core.logging_config import get_logger, setup_logging
 from health_check import router as health_router
@@ -33,12 +35,8 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Portfolia API...")
     logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'development')}")
-    logger.info(
-        f"Database URL: {settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else '***'}"
-    )
-    logger.info(
-        f"Redis URL: {settings.REDIS_URL.split('@')[1] if '@' in settings.REDIS_URL else '***'}"
-    )
+    logger.info(f"Database URL: {settings.db_url_sanitized}")
+    logger.info(f"Redis URL: {settings.redis_url_sanitized}")
 
     try:
         # Initialize database connection
@@ -50,12 +48,14 @@ async def lifespan(app: FastAPI):
             f"✅ Database connection initialized successfully in {db_init_time:.3f}s"
         )
 
-        # Run database migrations and create schemas
-        logger.info("🔄 Running database migrations and creating schemas...")
+        # Run database migrations and warm up the connection pool concurrently
+        logger.info("🔄 Running database migrations and warming up connection pool...")
         migration_start_time = time.time()
-        await create_tables()
+        await asyncio.gather(create_tables(), warmup_pool())
         migration_time = time.time() - migration_start_time
-        logger.info(f"✅ Database migrations completed in {migration_time:.3f}s")
+        logger.info(
+            f"✅ Database migrations and pool warmup completed in {migration_time:.3f}s"
+        )
 
         # Initialize database with sample data if needed
         logger.info("📊 Initializing database with sample data...")
@@ -110,6 +110,7 @@ app = FastAPI(
     description="Portfolio management and trading strategy API",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -145,15 +146,9 @@ try:
     logger.info("✅ Auth router included at /api/v1/auth")
 except ImportError as e:
     logger.warning(f"⚠️ Could not import auth router: {e}")
-    logger.error(f"❌ Auth router import error details: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Auth router import error details: %s", e)
 except Exception as e:
-    logger.error(f"❌ Unexpected error importing auth router: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Unexpected error importing auth router: %s", e)
 
 # Include market router
 try:
@@ -184,15 +179,9 @@ try:
     logger.info("Portfolio router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import portfolio router: {e}")
-    logger.error(f"Portfolio router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Portfolio router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing portfolio router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing portfolio router: %s", e)
 
 # Include assets router
 try:
@@ -202,15 +191,9 @@ try:
     logger.info("Assets router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import assets router: {e}")
-    logger.error(f"Assets router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Assets router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing assets router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing assets router: %s", e)
 
 # Include asset search router
 try:
@@ -220,15 +203,9 @@ try:
     logger.info("Search Asset router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import search router: {e}")
-    logger.error(f"Search Asset router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Search Asset router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing search asset router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing search asset router: %s", e)
 
 # Include transactions router
 try:
@@ -238,15 +215,9 @@ try:
     logger.info("Transactions router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import transactions router: {e}")
-    logger.error(f"Transactions router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Transactions router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing transactions router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing transactions router: %s", e)
 
 # Include transactions PDF router
 try:
@@ -258,15 +229,9 @@ try:
     logger.info("Transactions PDF router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import transactions PDF router: {e}")
-    logger.error(f"Transactions PDF router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Transactions PDF router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing transactions PDF router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing transactions PDF router: %s", e)
 
 # Include analytics router
 try:
@@ -276,15 +241,9 @@ try:
     logger.info("Analytics router included successfully")
 except ImportError as e:
     logger.warning(f"Could not import analytics router: {e}")
-    logger.error(f"Analytics router import error details: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Analytics router import error details: %s", e)
 except Exception as e:
-    logger.error(f"Unexpected error importing analytics router: {e}")
-    import traceback
-
-    logger.error(f"Full traceback: {traceback.format_exc()}")
+    logger.exception("Unexpected error importing analytics router: %s", e)
 
 # Include watchlist router
 try:
@@ -298,15 +257,9 @@ try:
     logger.info("✅ Watchlist router included at /api/v1/watchlists")
 except ImportError as e:
     logger.warning(f"⚠️ Could not import watchlist router: {e}")
-    logger.error(f"❌ Watchlist router import error details: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Watchlist router import error details: %s", e)
 except Exception as e:
-    logger.error(f"❌ Unexpected error importing watchlist router: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Unexpected error importing watchlist router: %s", e)
 
 # Include portfolio calculations router
 try:
@@ -322,15 +275,9 @@ try:
     logger.info("✅ Portfolio calculations router included at /api/v1/portfolios")
 except ImportError as e:
     logger.warning(f"⚠️ Could not import portfolio calculations router: {e}")
-    logger.error(f"❌ Portfolio calculations router import error details: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Portfolio calculations router import error details: %s", e)
 except Exception as e:
-    logger.error(f"❌ Unexpected error importing portfolio calculations router: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Unexpected error importing portfolio calculations router: %s", e)
 
 # Include account statements router
 try:
@@ -346,15 +293,9 @@ try:
     logger.info("✅ Account statements router included at /api/v1/account-statements")
 except ImportError as e:
     logger.warning(f"⚠️ Could not import account statements router: {e}")
-    logger.error(f"❌ Account statements router import error details: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Account statements router import error details: %s", e)
 except Exception as e:
-    logger.error(f"❌ Unexpected error importing account statements router: {e}")
-    import traceback
-
-    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+    logger.exception("❌ Unexpected error importing account statements router: %s", e)
 
 
 @app.get("/")
@@ -4,17 +4,51 @@ Test script for the new CAGR and XIRR calculations.
 This script demonstrates the key concepts and formulas implemented.
 """
 
-from datetime import datetime, timezone
-from typing import List, NamedTuple
+import math
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
-import pyxirr
+import numpy as np
+import pytest
+from scipy.optimize import brentq
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to the NumPy implementation
+    njit = None
 
-class CashFlow(NamedTuple):
-    """Represents a cash flow with date and amount."""
 
-    date: datetime
-    amount: float  # Positive for inflows, negative for outflows
+def calculate_cagr_batch(
+    beginning_values: np.ndarray, ending_values: np.ndarray, years: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate CAGR for many periods at once without per-element branching.
+
+    Periods longer than a year are annualized with
+    (Ending Value / Beginning Value)^(1/Years) - 1; shorter periods return the
+    simple return.
+
+    Args:
+        beginning_values: Initial investment values
+        ending_values: Final investment values
+        years: Time periods in years
+
+    Returns:
+        CAGR per period as a fraction, 0.0 where the inputs are invalid
+    """
+    beginning_values = np.asarray(beginning_values, dtype=np.float64)
+    ending_values = np.asarray(ending_values, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+
+    valid = (beginning_values > 0) & (years > 0)
+    ratio = np.divide(
+        ending_values,
+        beginning_values,
+        out=np.ones_like(ending_values),
+        where=valid,
+    )
+    exponent = 1.0 / np.where(years > 1, years, 1.0)
+    return np.where(valid, np.power(ratio, exponent) - 1.0, 0.0)
 
 
 def calculate_cagr(beginning_value: float, ending_value: float, years: float) -> float:
@@ -33,46 +67,250 @@ def calculate_cagr(beginning_value: float, ending_value: float, years: float) ->
         return 0.0
 
     if years > 1:
-        # Annualized CAGR for periods > 1 year
-        cagr = ((ending_value / beginning_value) ** (1 / years)) - 1
+        # Annualized CAGR for periods > 1 year; math.pow avoids the array
+        # round-trip of calculate_cagr_batch for single values
+        cagr = math.pow(ending_value / beginning_value, 1.0 / years) - 1.0
     else:
         # Simple return for periods <= 1 year
-        cagr = (ending_value / beginning_value) - 1
+        cagr = (ending_value / beginning_value) - 1.0
 
     return cagr * 100
 
 
-def calculate_xirr(cash_flows: List[CashFlow]) -> float:
+def xnpv(rate: float, days_frac: np.ndarray, amounts: np.ndarray) -> float:
+    """
+    Net present value of cash flows discounted over fractional years.
+
+    Args:
+        rate: Annual discount rate (0.1 for 10%)
+        days_frac: Years elapsed since the first cash flow
+        amounts: Cash flow amounts aligned with days_frac
+
+    Returns:
+        Sum of the discounted cash flows
+    """
+    return (amounts * (1.0 + rate) ** (-days_frac)).sum()
+
+
+def npv_and_dnpv(
+    rate: float, days_frac: np.ndarray, amounts: np.ndarray
+) -> Tuple[float, float]:
+    """
+    Net present value and its derivative with respect to the rate.
+
+    Both share a single evaluation of the discount factors, which is the
+    dominant cost of each Newton step.
+
+    Args:
+        rate: Annual discount rate (0.1 for 10%)
+        days_frac: Years elapsed since the first cash flow
+        amounts: Cash flow amounts aligned with days_frac
+
+    Returns:
+        Tuple of (npv, d(npv)/d(rate))
+    """
+    base = (1.0 + rate) ** (-days_frac)
+    npv = (amounts * base).sum()
+    dnpv = -(days_frac * amounts * base).sum() / (1.0 + rate)
+    return npv, dnpv
+
+
+def _npv_and_dnpv_loop(
+    rate: float, days_frac: np.ndarray, amounts: np.ndarray
+) -> Tuple[float, float]:
+    """Single-pass loop form of npv_and_dnpv, compiled with Numba when available."""
+    npv = 0.0
+    dnpv = 0.0
+    for i in range(days_frac.shape[0]):
+        discounted = amounts[i] * (1.0 + rate) ** (-days_frac[i])
+        npv += discounted
+        dnpv -= days_frac[i] * discounted
+    return npv, dnpv / (1.0 + rate)
+
+
+if njit is not None:
+    # Fuses the power, multiply and reductions into one loop without temporaries
+    npv_and_dnpv = njit(cache=True, fastmath=True)(_npv_and_dnpv_loop)
+
+
+def _newton_xirr(
+    days_frac: np.ndarray,
+    amounts: np.ndarray,
+    guess: float = 0.1,
+    max_iter: int = 20,
+    tol: float = 1e-8,
+) -> Optional[float]:
+    """Newton-Raphson XIRR; returns None when the iteration fails to converge."""
+    rate = guess
+    for _ in range(max_iter):
+        npv, dnpv = npv_and_dnpv(rate, days_frac, amounts)
+        if abs(npv) < tol:
+            return rate
+        if dnpv == 0:
+            return None
+        rate -= npv / dnpv
+        # Overshooting past -100% has no meaning; leave it to the bracketed solver
+        if not np.isfinite(rate) or rate <= -1.0:
+            return None
+    return None
+
+
+def cf_array(entries: List[Tuple[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build columnar cash flow arrays from (ISO date, amount) pairs.
+
+    Args:
+        entries: Cash flows as ("YYYY-MM-DD", amount) tuples
+
+    Returns:
+        Tuple of (datetime64[D] dates, float64 amounts)
+    """
+    dates = np.array([entry[0] for entry in entries], dtype="datetime64[D]")
+    amounts = np.array([entry[1] for entry in entries], dtype=np.float64)
+    return dates, amounts
+
+
+def year_fractions(
+    dates: np.ndarray, origin: Optional[np.datetime64] = None
+) -> np.ndarray:
+    """
+    Convert dates to years elapsed (ACT/365) since an origin date.
+
+    XIRR only depends on the spacing between cash flows, so day counts can be
+    computed once against a shared origin and reused for every period slice.
+
+    Args:
+        dates: Date or array of dates as datetime64
+        origin: Reference date, defaults to the first entry of dates
+
+    Returns:
+        Year fractions with the same shape as dates
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if origin is None:
+        origin = dates.flat[0]
+    # Whole day counts fit comfortably in int32; the year fractions stay float64
+    # because float32 rounding would perturb the NPV beyond the solver tolerance
+    day_counts = (dates - origin).astype(np.int32)
+    return day_counts / 365.0
+
+
+@lru_cache(maxsize=256)
+def _cached_xirr(days_key: bytes, amounts_key: bytes) -> float:
+    """Solve XIRR for cash flows serialized as raw float64 buffers."""
+    days = np.frombuffer(days_key, dtype=np.float64)
+    amounts = np.frombuffer(amounts_key, dtype=np.float64)
+
+    rate = _newton_xirr(days, amounts)
+    if rate is not None:
+        return rate
+
+    # Fall back to a bracketed Brent search, which stays bounded where Newton
+    # steps diverge or overshoot past -100%
+    return brentq(
+        xnpv,
+        args=(days, amounts),
+        a=-0.999,
+        b=100.0,
+        xtol=1e-8,
+        maxiter=50,
+    )
+
+
+def calculate_xirr(days_frac: np.ndarray, amounts: np.ndarray) -> float:
     """
     Calculate XIRR for irregular cash flows.
 
     Args:
-        cash_flows: List of cash flows with dates and amounts
+        days_frac: Cash flow times in years from any fixed origin,
+            see year_fractions
+        amounts: Cash flow amounts, positive for inflows and negative for outflows
 
     Returns:
         XIRR as a percentage
     """
-    dates = [cf.date for cf in cash_flows]
-    amounts = [cf.amount for cf in cash_flows]
-
     # Validate data
-    if len(dates) < 2:
+    if len(days_frac) < 2:
         return 0.0
 
-    has_positive = any(a > 0 for a in amounts)
-    has_negative = any(a < 0 for a in amounts)
+    # Flows that net to (numerically) zero have a 0% return; skip the solver
+    total = amounts.sum()
+    largest = np.abs(amounts).max()
+    if largest == 0 or abs(total) < 1e-12 * largest:
+        return 0.0
 
-    if not (has_positive and has_negative):
+    # Inflows and outflows are both required, i.e. min and max differ in sign
+    if amounts.min() * amounts.max() >= 0:
         return 0.0
 
     try:
-        xirr_result = pyxirr.xirr(dates, amounts)
+        # Array buffers are hashable as bytes, so repeated cash flow sets reuse
+        # the previous root-finding result
+        xirr_result = _cached_xirr(
+            np.ascontiguousarray(days_frac, dtype=np.float64).tobytes(),
+            np.ascontiguousarray(amounts, dtype=np.float64).tobytes(),
+        )
         return xirr_result * 100 if xirr_result is not None else 0.0
     except Exception as e:
         print(f"XIRR calculation error: {e}")
         return 0.0
 
 
+@pytest.mark.parametrize(
+    "beginning_value, ending_value, years, expected",
+    [
+        (10000, 12100, 2.0, 10.0),  # Two-year investment
+        (5000, 5250, 0.5, 5.0),  # Six-month investment, simple return
+        (1000, 1610, 5.0, 9.99),  # Five-year investment
+        (0, 1000, 2.0, 0.0),  # Invalid beginning value
+    ],
+)
+def test_cagr(beginning_value, ending_value, years, expected):
+    """CAGR matches the worked examples."""
+    cagr = calculate_cagr(beginning_value, ending_value, years)
+    assert abs(cagr - expected) < 0.01
+    batch = calculate_cagr_batch(
+        np.array([beginning_value]), np.array([ending_value]), np.array([years])
+    )
+    assert abs(batch[0] * 100 - expected) < 0.01
+
+
+@pytest.mark.parametrize(
+    "entries, expected",
+    [
+        (
+            [
+                ("2023-01-01", -1000),
+                ("2023-02-01", -1000),
+                ("2023-03-01", -1000),
+                ("2023-04-01", -1000),
+                ("2023-05-01", -1000),
+                ("2023-06-01", -1000),
+                ("2023-12-31", 6500),
+            ],
+            10.63,
+        ),
+        (
+            [
+                ("2022-01-15", -5000),
+                ("2022-06-10", -2000),
+                ("2022-09-20", 1500),
+                ("2023-03-25", -1000),
+                ("2024-01-01", 8000),
+            ],
+            12.08,
+        ),
+        ([("2021-01-01", -10000), ("2024-01-01", 13500)], 10.52),
+        ([("2021-01-01", -10000), ("2024-01-01", 10000)], 0.0),  # Net zero
+        ([("2021-01-01", 1000), ("2024-01-01", 2000)], 0.0),  # No outflow
+    ],
+)
+def test_xirr(entries, expected):
+    """XIRR matches the worked examples and handles degenerate flows."""
+    dates, amounts = cf_array(entries)
+    assert abs(calculate_xirr(year_fractions(dates), amounts) - expected) < 0.01
+
+
 def test_cagr_examples():
     """Test CAGR calculations with various scenarios."""
     print("=== CAGR Test Examples ===")
@@ -102,63 +340,44 @@ def test_xirr_examples():
 
     # Example 1: Regular monthly investments
     print("\n1. Regular monthly investments:")
-    cash_flows1 = [
-        CashFlow(
-            datetime(2023, 1, 1, tzinfo=timezone.utc), -1000
-        ),  # Initial investment
-        CashFlow(
-            datetime(2023, 2, 1, tzinfo=timezone.utc), -1000
-        ),  # Monthly investment
-        CashFlow(
-            datetime(2023, 3, 1, tzinfo=timezone.utc), -1000
-        ),  # Monthly investment
-        CashFlow(
-            datetime(2023, 4, 1, tzinfo=timezone.utc), -1000
-        ),  # Monthly investment
-        CashFlow(
-            datetime(2023, 5, 1, tzinfo=timezone.utc), -1000
-        ),  # Monthly investment
-        CashFlow(
-            datetime(2023, 6, 1, tzinfo=timezone.utc), -1000
-        ),  # Monthly investment
-        CashFlow(datetime(2023, 12, 31, tzinfo=timezone.utc), 6500),  # Final value
-    ]
+    # -$1000 on the first of each month from January to June, then the final value
+    monthly_dates = np.arange("2023-01", "2023-07", dtype="datetime64[M]")
+    dates1 = np.append(
+        monthly_dates.astype("datetime64[D]"), np.datetime64("2023-12-31")
+    )
+    amounts1 = np.append(np.full(len(monthly_dates), -1000.0), 6500.0)
 
     print("   Cash flows: -$1000 monthly for 6 months, final value $6500")
-    xirr1 = calculate_xirr(cash_flows1)
+    xirr1 = calculate_xirr(year_fractions(dates1), amounts1)
     print(f"   XIRR: {xirr1:.2f}%")
 
     # Example 2: Irregular investments with a sale
     print("\n2. Irregular investments with partial sale:")
-    cash_flows2 = [
-        CashFlow(
-            datetime(2022, 1, 15, tzinfo=timezone.utc), -5000
-        ),  # Initial investment
-        CashFlow(
-            datetime(2022, 6, 10, tzinfo=timezone.utc), -2000
-        ),  # Additional investment
-        CashFlow(datetime(2022, 9, 20, tzinfo=timezone.utc), 1500),  # Partial sale
-        CashFlow(datetime(2023, 3, 25, tzinfo=timezone.utc), -1000),  # More investment
-        CashFlow(datetime(2024, 1, 1, tzinfo=timezone.utc), 8000),  # Final value
-    ]
+    dates2, amounts2 = cf_array(
+        [
+            ("2022-01-15", -5000),  # Initial investment
+            ("2022-06-10", -2000),  # Additional investment
+            ("2022-09-20", 1500),  # Partial sale
+            ("2023-03-25", -1000),  # More investment
+            ("2024-01-01", 8000),  # Final value
+        ]
+    )
 
     print("   Cash flows: -$5000, -$2000, +$1500, -$1000, final value $8000")
-    xirr2 = calculate_xirr(cash_flows2)
+    xirr2 = calculate_xirr(year_fractions(dates2), amounts2)
     print(f"   XIRR: {xirr2:.2f}%")
 
     # Example 3: Single lump sum investment
     print("\n3. Single lump sum investment:")
-    cash_flows3 = [
-        CashFlow(
-            datetime(2021, 1, 1, tzinfo=timezone.utc), -10000
-        ),  # Initial investment
-        CashFlow(
-            datetime(2024, 1, 1, tzinfo=timezone.utc), 13500
-        ),  # Final value after 3 years
-    ]
+    dates3, amounts3 = cf_array(
+        [
+            ("2021-01-01", -10000),  # Initial investment
+            ("2024-01-01", 13500),  # Final value after 3 years
+        ]
+    )
 
     print("   Cash flows: -$10000 initial, $13500 final after 3 years")
-    xirr3 = calculate_xirr(cash_flows3)
+    xirr3 = calculate_xirr(year_fractions(dates3), amounts3)
     print(f"   XIRR: {xirr3:.2f}%")
 
     # Compare with CAGR for the same scenario
@@ -174,32 +393,37 @@ def demonstrate_period_calculations():
     print("\n=== Period Calculation Examples ===")
 
     # Simulate a portfolio with transactions over time
-    all_cash_flows = [
-        CashFlow(
-            datetime(2020, 1, 1, tzinfo=timezone.utc), -5000
-        ),  # Initial investment
-        CashFlow(
-            datetime(2020, 6, 1, tzinfo=timezone.utc), -2000
-        ),  # Additional investment
-        CashFlow(datetime(2021, 3, 1, tzinfo=timezone.utc), -1500),  # More investment
-        CashFlow(datetime(2022, 1, 1, tzinfo=timezone.utc), -1000),  # More investment
-        CashFlow(datetime(2022, 8, 1, tzinfo=timezone.utc), 2000),  # Partial sale
-        CashFlow(datetime(2023, 6, 1, tzinfo=timezone.utc), -3000),  # More investment
-    ]
+    all_dates, all_amounts = cf_array(
+        [
+            ("2020-01-01", -5000),  # Initial investment
+            ("2020-06-01", -2000),  # Additional investment
+            ("2021-03-01", -1500),  # More investment
+            ("2022-01-01", -1000),  # More investment
+            ("2022-08-01", 2000),  # Partial sale
+            ("2023-06-01", -3000),  # More investment
+        ]
+    )
 
     # Current portfolio value
-    current_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    current_date = np.datetime64("2024-01-01", "D")
     current_value = 15000
 
     print(f"Portfolio transactions from 2020-2024, current value: ${current_value:,}")
 
+    # Day counts are measured once from the first cash flow and shared by
+    # every period below
+    origin = all_dates[0]
+    all_days = year_fractions(all_dates, origin)
+    current_days = year_fractions(current_date, origin)
+
     # Calculate inception XIRR
-    inception_flows = all_cash_flows + [CashFlow(current_date, current_value)]
-    inception_xirr = calculate_xirr(inception_flows)
+    inception_xirr = calculate_xirr(
+        np.append(all_days, current_days), np.append(all_amounts, current_value)
+    )
     print(f"Inception XIRR: {inception_xirr:.2f}%")
 
     # Calculate last 2 years XIRR
-    two_years_ago = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    two_years_ago = np.datetime64("2022-01-01", "D")
 
     # For period calculations, we need:
     # 1. Portfolio value at start of period (would need to calculate from holdings)
@@ -209,21 +433,24 @@ def demonstrate_period_calculations():
     # Simulate portfolio value 2 years ago (this would be calculated from actual holdings)
     portfolio_value_2_years_ago = 8500
 
-    # Get cash flows from last 2 years
-    period_flows = [cf for cf in all_cash_flows if cf.date >= two_years_ago]
-
-    # Create XIRR calculation for 2-year period
-    two_year_flows = (
-        [
-            CashFlow(
-                two_years_ago, -portfolio_value_2_years_ago
-            )  # Initial value as outflow
-        ]
-        + period_flows
-        + [CashFlow(current_date, current_value)]  # Current value as inflow
+    # Get cash flows from last 2 years; dates are sorted, so a binary search
+    # finds the first one inside the period
+    period_start = np.searchsorted(all_dates, two_years_ago)
+
+    # Create XIRR calculation for 2-year period: initial value as outflow,
+    # period cash flows, then current value as inflow
+    two_year_days = np.concatenate(
+        (
+            [year_fractions(two_years_ago, origin)],
+            all_days[period_start:],
+            [current_days],
+        )
+    )
+    two_year_amounts = np.concatenate(
+        ([-portfolio_value_2_years_ago], all_amounts[period_start:], [current_value])
     )
 
-    two_year_xirr = calculate_xirr(two_year_flows)
+    two_year_xirr = calculate_xirr(two_year_days, two_year_amounts)
     print(f"Last 2 years XIRR: {two_year_xirr:.2f}%")
 
     # Calculate 2-year CAGR for comparison
@@ -10,26 +10,29 @@ import sys
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
-from decimal import Decimal
-
-from sqlalchemy.orm import Session
+from itertools import islice
 
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 
-from app.core.database.connection import SessionLocal
-from app.core.database.models import Asset
-from app.core.database.models import Portfolio
-from app.core.database.models import PortfolioAsset
-from app.core.database.models import Transaction
-from app.core.database.models import TransactionType
-from core.services.utils import PeriodType
-from app.core.services.portfolio_calculation_service import PortfolioCalculationService
-
 
 async def analyze_portfolio_4():
     """Analyze portfolio 4 data and test calculations."""
-    
+    # Deferred so the ORM and service stack only load when the analysis runs.
+    # Import through the app package root ("core.") like the services do, so
+    # the models are not registered a second time under "app.core."
+    from sqlalchemy.orm import selectinload
+
+    from core.database.connection import SessionLocal
+    from core.database.models import Portfolio
+    from core.database.models import PortfolioAsset
+    from core.database.models import Transaction
+    from core.services.portfolio_calculation_service import PortfolioCalculationService
+    from core.services.utils import PeriodType
+
+    # Capture "now" once so every period window below shares the same reference
+    now = datetime.now(timezone.utc)
+
     # Get database session
     db = SessionLocal()
     
@@ -49,7 +52,14 @@ async def analyze_portfolio_4():
         print(f"- Is Active: {portfolio.is_active}")
         
         # Get all transactions
-        transactions = db.query(Transaction).filter(Transaction.portfolio_id == 4).order_by(Transaction.transaction_date).all()
+        # Eager-load the related assets in one extra query instead of one per row
+        transactions = (
+            db.query(Transaction)
+            .options(selectinload(Transaction.asset))
+            .filter(Transaction.portfolio_id == 4)
+            .order_by(Transaction.transaction_date)
+            .all()
+        )
         print(f"\nTotal Transactions: {len(transactions)}")
         
         if not transactions:
@@ -66,32 +76,50 @@ async def analyze_portfolio_4():
         print(f"- Time span: {(last_transaction.transaction_date - first_transaction.transaction_date).days} days")
         
         # Show detailed transaction breakdown
-        print(f"\nDetailed Transactions:")
-        for i, tx in enumerate(transactions[:10]):  # Show first 10
-            print(f"  {i+1}. {tx.transaction_date} | {tx.transaction_type.value} | "
-                  f"{tx.asset.symbol if tx.asset else 'N/A'} | "
-                  f"Qty: {tx.quantity} | Price: ${tx.price} | Total: ${tx.total_amount}")
+        # Build each report section in a buffer and write it with one print
+        lines = ["\nDetailed Transactions:"]
+        for i, tx in islice(enumerate(transactions), 10):  # Show first 10
+            lines.append(f"  {i+1}. {tx.transaction_date} | {tx.transaction_type.value} | "
+                         f"{tx.asset.symbol if tx.asset else 'N/A'} | "
+                         f"Qty: {tx.quantity} | Price: ${tx.price} | Total: ${tx.total_amount}")
         
         if len(transactions) > 10:
-            print(f"  ... and {len(transactions) - 10} more transactions")
+            lines.append(f"  ... and {len(transactions) - 10} more transactions")
+        print("\n".join(lines))
         
         # Get current portfolio assets
-        portfolio_assets = db.query(PortfolioAsset).filter(PortfolioAsset.portfolio_id == 4).all()
-        print(f"\nCurrent Portfolio Assets: {len(portfolio_assets)}")
+        portfolio_assets = (
+            db.query(PortfolioAsset)
+            .options(selectinload(PortfolioAsset.asset))
+            .filter(PortfolioAsset.portfolio_id == 4)
+            .all()
+        )
+        lines = [f"\nCurrent Portfolio Assets: {len(portfolio_assets)}"]
         
         for asset in portfolio_assets:
             if asset.quantity and float(asset.quantity) > 0:
-                print(f"- {asset.asset.symbol if asset.asset else 'Unknown'}: "
-                      f"Qty {asset.quantity} | "
-                      f"Cost Basis: ${asset.cost_basis_total} | "
-                      f"Current Value: ${asset.current_value or 'N/A'}")
+                lines.append(f"- {asset.asset.symbol if asset.asset else 'Unknown'}: "
+                             f"Qty {asset.quantity} | "
+                             f"Cost Basis: ${asset.cost_basis_total} | "
+                             f"Current Value: ${asset.current_value or 'N/A'}")
+        print("\n".join(lines))
         
         # Test portfolio calculations
         print(f"\n" + "="*50)
         print("TESTING PORTFOLIO CALCULATIONS")
         print("="*50)
         
-        service = PortfolioCalculationService(db)
+        async def in_own_session(method, **kwargs):
+            """Await a service method on a service with its own session.
+
+            The calculations write refreshed asset values and commit part-way
+            through, so concurrent calls must not share one Session.
+            """
+            session = SessionLocal()
+            try:
+                return await method(PortfolioCalculationService(session), **kwargs)
+            finally:
+                session.close()
         
         # Test different periods
         periods_to_test = [
@@ -101,31 +129,43 @@ async def analyze_portfolio_4():
             PeriodType.YTD
         ]
         
-        for period in periods_to_test:
-            print(f"\n--- Testing Period: {period} ---")
-            try:
-                result = await service.calculate_portfolio_performance(
+        # Periods are independent, so run them concurrently (one session each)
+        # and report in order
+        results = await asyncio.gather(
+            *(
+                in_own_session(
+                    PortfolioCalculationService.calculate_portfolio_performance,
                     portfolio_id=4,
                     user_id=portfolio.user_id,
                     period=period
                 )
-                
-                print(f"Portfolio Performance ({period}):")
-                print(f"- Start Date: {result.get('start_date')}")
-                print(f"- End Date: {result.get('end_date')}")
-                print(f"- Current Value: ${result.get('current_value', 0):,.2f}")
-                
-                metrics = result.get('metrics', {})
-                print(f"- CAGR: {metrics.get('cagr')}")
-                print(f"- XIRR: {metrics.get('xirr')}")
-                print(f"- TWR: {metrics.get('twr')}")
-                print(f"- MWR: {metrics.get('mwr')}")
-                print(f"- Volatility: {metrics.get('volatility')}")
-                print(f"- Sharpe Ratio: {metrics.get('sharpe_ratio')}")
-                print(f"- Max Drawdown: {metrics.get('max_drawdown')}")
-                
-            except Exception as e:
-                print(f"Error calculating {period}: {e}")
+                for period in periods_to_test
+            ),
+            return_exceptions=True
+        )
+        
+        lines = []
+        for period, result in zip(periods_to_test, results):
+            lines.append(f"\n--- Testing Period: {period} ---")
+            if isinstance(result, Exception):
+                lines.append(f"Error calculating {period}: {result}")
+                continue
+            
+            metrics = result.get('metrics', {})
+            lines.extend([
+                f"Portfolio Performance ({period}):",
+                f"- Start Date: {result.get('start_date')}",
+                f"- End Date: {result.get('end_date')}",
+                f"- Current Value: ${result.get('current_value', 0):,.2f}",
+                f"- CAGR: {metrics.get('cagr')}",
+                f"- XIRR: {metrics.get('xirr')}",
+                f"- TWR: {metrics.get('twr')}",
+                f"- MWR: {metrics.get('mwr')}",
+                f"- Volatility: {metrics.get('volatility')}",
+                f"- Sharpe Ratio: {metrics.get('sharpe_ratio')}",
+                f"- Max Drawdown: {metrics.get('max_drawdown')}",
+            ])
+        print("\n".join(lines))
         
         # Test benchmark comparison
         print(f"\n" + "="*50)
@@ -134,34 +174,45 @@ async def analyze_portfolio_4():
         
         benchmark_symbol = "AAPL"
         
-        for period in periods_to_test:
-            print(f"\n--- Testing Benchmark Comparison: {period} vs {benchmark_symbol} ---")
-            try:
-                comparison = await service.compare_portfolio_to_benchmark(
+        comparisons = await asyncio.gather(
+            *(
+                in_own_session(
+                    PortfolioCalculationService.compare_portfolio_to_benchmark,
                     portfolio_id=4,
                     user_id=portfolio.user_id,
                     benchmark_symbol=benchmark_symbol,
                     period=period
                 )
-                
-                portfolio_perf = comparison.get('portfolio_performance', {})
-                benchmark_perf = comparison.get('benchmark_performance', {})
-                comparison_metrics = comparison.get('comparison', {})
-                
-                print(f"Portfolio vs Benchmark ({period}):")
-                print(f"Portfolio CAGR: {portfolio_perf.get('metrics', {}).get('cagr')}")
-                print(f"Benchmark CAGR: {benchmark_perf.get('metrics', {}).get('cagr')}")
-                print(f"CAGR Difference: {comparison_metrics.get('cagr_difference')}")
-                print(f"Portfolio TWR: {portfolio_perf.get('metrics', {}).get('twr')}")
-                print(f"Benchmark TWR: {benchmark_perf.get('metrics', {}).get('twr')}")
-                print(f"TWR Difference: {comparison_metrics.get('twr_difference')}")
-                print(f"Outperforming: {comparison_metrics.get('outperforming')}")
-                
-                if benchmark_perf.get('error'):
-                    print(f"Benchmark Error: {benchmark_perf.get('error')}")
-                
-            except Exception as e:
-                print(f"Error in benchmark comparison for {period}: {e}")
+                for period in periods_to_test
+            ),
+            return_exceptions=True
+        )
+        
+        lines = []
+        for period, comparison in zip(periods_to_test, comparisons):
+            lines.append(f"\n--- Testing Benchmark Comparison: {period} vs {benchmark_symbol} ---")
+            if isinstance(comparison, Exception):
+                lines.append(f"Error in benchmark comparison for {period}: {comparison}")
+                continue
+            
+            portfolio_perf = comparison.get('portfolio_performance', {})
+            benchmark_perf = comparison.get('benchmark_performance', {})
+            comparison_metrics = comparison.get('comparison', {})
+            
+            lines.extend([
+                f"Portfolio vs Benchmark ({period}):",
+                f"Portfolio CAGR: {portfolio_perf.get('metrics', {}).get('cagr')}",
+                f"Benchmark CAGR: {benchmark_perf.get('metrics', {}).get('cagr')}",
+                f"CAGR Difference: {comparison_metrics.get('cagr_difference')}",
+                f"Portfolio TWR: {portfolio_perf.get('metrics', {}).get('twr')}",
+                f"Benchmark TWR: {benchmark_perf.get('metrics', {}).get('twr')}",
+                f"TWR Difference: {comparison_metrics.get('twr_difference')}",
+                f"Outperforming: {comparison_metrics.get('outperforming')}",
+            ])
+            
+            if benchmark_perf.get('error'):
+                lines.append(f"Benchmark Error: {benchmark_perf.get('error')}")
+        print("\n".join(lines))
         
         # Test specific date range scenarios
         print(f"\n" + "="*50)
@@ -169,36 +220,25 @@ async def analyze_portfolio_4():
         print("="*50)
         
         # Find actual first transaction date within 6 months
-        six_months_ago = datetime.now(timezone.utc) - timedelta(days=180)
+        six_months_ago = now - timedelta(days=180)
         
         transactions_in_6m = [t for t in transactions if t.transaction_date >= six_months_ago]
         
         if transactions_in_6m:
             actual_start_date = transactions_in_6m[0].transaction_date
             print(f"6-month period requested, but actual first transaction in period: {actual_start_date}")
-            print(f"Suggested aligned calculation period: {(datetime.now(timezone.utc) - actual_start_date).days} days")
+            print(f"Suggested aligned calculation period: {(now - actual_start_date).days} days")
         else:
             print("No transactions in the last 6 months - this is where the issue occurs!")
             
         # Test with 1 year period
-        one_year_ago = datetime.now(timezone.utc) - timedelta(days=365)
+        one_year_ago = now - timedelta(days=365)
         transactions_in_1y = [t for t in transactions if t.transaction_date >= one_year_ago]
         
         if transactions_in_1y:
             actual_start_date = transactions_in_1y[0].transaction_date
             print(f"1-year period requested, but actual first transaction in period: {actual_start_date}")
-            print(f"Suggested aligned calculation period: {(datetime.now(timezone.utc) - actual_start_date).days} days")
-        else:
-            print("No transactions in the last 1 year")
-            
-    finally:
-        db.close()
-
-if __name__ == "__main__":
-    asyncio.run(analyze_portfolio_4())
-            actual_start_date = transactions_in_1y[0].transaction_date
-            print(f"1-year period requested, but actual first transaction in period: {actual_start_date}")
-            print(f"Suggested aligned calculation period: {(datetime.now(timezone.utc) - actual_start_date).days} days")
+            print(f"Suggested aligned calculation period: {(now - actual_start_date).days} days")
         else:
             print("No transactions in the last 1 year")
             
@@ -206,4 +246,10 @@ if __name__ == "__main__":
         db.close()
 
 if __name__ == "__main__":
-    asyncio.run(analyze_portfolio_4())
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(analyze_portfolio_4())
+    else:
+        # uvloop.install() is deprecated from Python 3.12; run() sets up the loop
+        uvloop.run(analyze_portfolio_4())
@@ -8,22 +8,34 @@ Tests various scenarios using Apple historical data including:
 """
 
 import asyncio
-from datetime import datetime
+import copy
+from datetime import datetime, timezone
 from decimal import Decimal
-import json
+from functools import lru_cache
 import logging
-from typing import Any, Dict, List, Optional
+import types
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
+import numpy as np
+import orjson
 import pandas as pd
 import pyxirr
 
 # Import the service and related classes
+from app.core.database import connection as _dbconn
 from app.core.services.portfolio_calculation_service import (
     PortfolioCalculationService,
 )
+from core.database.models import (
+    Asset,
+    Portfolio,
+    PortfolioAsset,
+    Transaction,
+    TransactionType,
+)
 from core.services.utils import PeriodType
 
 # Set up logging
@@ -34,6 +46,8 @@ logger = logging.getLogger(__name__)
 class MockAsset:
     """Mock Asset model for testing"""
 
+    __slots__ = ("symbol", "quantity", "current_value")
+
     def __init__(
         self, symbol: str, quantity: Decimal, current_value: Optional[float] = None
     ):
@@ -45,18 +59,33 @@ class MockAsset:
 class MockPortfolioAsset:
     """Mock PortfolioAsset model for testing"""
 
+    __slots__ = ("id", "asset_id", "asset", "quantity", "current_value")
+
     def __init__(self, asset: MockAsset, quantity: Decimal):
+        self.id = 1  # Mock holding ID
+        self.asset_id = 1  # Mock asset ID, matching MockTransaction
         self.asset = asset
         self.quantity = quantity
+        self.current_value = asset.current_value
 
 
 class MockTransaction:
     """Mock Transaction model for testing"""
 
+    __slots__ = (
+        "transaction_date",
+        "transaction_type",
+        "quantity",
+        "price_per_share",
+        "total_amount",
+        "asset",
+        "asset_id",
+    )
+
     def __init__(
         self,
         transaction_date: datetime,
-        transaction_type: str,
+        transaction_type: TransactionType,
         quantity: Decimal,
         price_per_share: Decimal,
         asset_symbol: str,
@@ -65,6 +94,7 @@ class MockTransaction:
         self.transaction_type = transaction_type
         self.quantity = quantity
         self.price_per_share = price_per_share
+        self.total_amount = quantity * price_per_share
         self.asset = MockAsset(asset_symbol, quantity)
         self.asset_id = 1  # Mock asset ID
 
@@ -72,6 +102,8 @@ class MockTransaction:
 class MockPortfolio:
     """Mock Portfolio model for testing"""
 
+    __slots__ = ("id", "name", "assets", "transactions")
+
     def __init__(
         self,
         portfolio_id: int,
@@ -85,27 +117,152 @@ class MockPortfolio:
         self.transactions = transactions
 
 
+def _to_decimal(value: float) -> Decimal:
+    """Convert a float to the Decimal the models carry, at the fixture boundary"""
+    return Decimal(repr(value))
+
+
+def _build_buy_schedule(
+    dates: Sequence[datetime],
+    prices: np.ndarray,
+    dollar_amounts: np.ndarray,
+    asset_symbol: str = "AAPL",
+) -> Tuple[List[MockTransaction], float]:
+    """Create BUY transactions investing dollar_amounts at prices on dates.
+
+    Returns the transactions together with their total quantity, summed once
+    in float64 rather than through a chain of Decimal additions.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    quantities = np.asarray(dollar_amounts, dtype=np.float64) / prices
+
+    transactions = [
+        MockTransaction(
+            transaction_date=transaction_date,
+            transaction_type=TransactionType.BUY,
+            quantity=_to_decimal(quantity),
+            price_per_share=_to_decimal(price),
+            asset_symbol=asset_symbol,
+        )
+        for transaction_date, quantity, price in zip(
+            dates, quantities.tolist(), prices.tolist()
+        )
+    ]
+    return transactions, float(quantities.sum())
+
+
+def _xirr_two_flow(cf0: float, cf1: float, d0: datetime, d1: datetime) -> float:
+    """Closed-form XIRR for a single outflow cf0 on d0 and inflow cf1 on d1"""
+    return (-cf1 / cf0) ** (365.0 / (d1 - d0).days) - 1
+
+
+class FakeQuery:
+    """Chainable stand-in for a SQLAlchemy query over the fake session"""
+
+    def __init__(self, rows: List[Any]):
+        self._rows = rows
+
+    def filter(self, *args, **kwargs) -> "FakeQuery":
+        return self
+
+    def order_by(self, *args, **kwargs) -> "FakeQuery":
+        return self
+
+    def first(self) -> Optional[Any]:
+        return self._rows[0] if self._rows else None
+
+    def all(self) -> List[Any]:
+        return list(self._rows)
+
+
+class FakeDB:
+    """Plain stand-in for the database session, avoiding MagicMock lookups"""
+
+    def __init__(
+        self,
+        portfolio: Optional[MockPortfolio] = None,
+        transactions: Optional[List[MockTransaction]] = None,
+    ):
+        self._p = portfolio
+        self._txs = transactions if transactions is not None else []
+
+        # Rows served by query(model), keyed by the models the service queries
+        holdings = portfolio.assets if portfolio is not None else []
+        self._rows: Dict[type, List[Any]] = {
+            Portfolio: [portfolio] if portfolio is not None else [],
+            Transaction: self._txs,
+            PortfolioAsset: holdings,
+            Asset: [holding.asset for holding in holdings],
+        }
+
+    async def get(self, *args, **kwargs) -> Optional[MockPortfolio]:
+        return self._p
+
+    def scalars(self, *args, **kwargs) -> types.SimpleNamespace:
+        return types.SimpleNamespace(all=lambda: self._txs)
+
+    def query(self, model: type, *args, **kwargs) -> FakeQuery:
+        return FakeQuery(self._rows.get(model, []))
+
+    def commit(self) -> None:
+        pass
+
+
 class MockMarketDataService:
     """Mock MarketDataService that uses Apple historical data"""
 
     def __init__(self, apple_data: Dict[str, Any]):
         self.apple_data = apple_data
         self.df = self._create_dataframe()
+        # Date-range slices already cut from self.df, keyed by (start_ns, end_ns);
+        # wrapped per instance so the cache is dropped with the service
+        self._slice = lru_cache(maxsize=64)(self._slice_ns)
 
     def _create_dataframe(self) -> pd.DataFrame:
         """Convert Apple JSON data to pandas DataFrame"""
-        df = pd.DataFrame(self.apple_data["data"])
-        df["Date"] = pd.to_datetime(df["Date"], utc=True)
-        df = df.set_index("Date")
+        rows = self.apple_data["data"]
+        # Transpose the row dicts into columns once instead of per-row construction
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+        dates = pd.to_datetime(
+            columns.pop("Date"), utc=True, format="%Y-%m-%dT%H:%M:%S%z", cache=True
+        )
+
+        # Convert string values to numbers in C; fall back to coercion on bad input
+        numeric_dtypes = {
+            "Open": np.float64,
+            "High": np.float64,
+            "Low": np.float64,
+            "Close": np.float64,
+            "Volume": np.int64,
+        }
+        for col, dtype in numeric_dtypes.items():
+            try:
+                columns[col] = np.array(columns[col], dtype=dtype)
+            except (TypeError, ValueError):
+                columns[col] = pd.to_numeric(columns[col], errors="coerce")
 
-        # Convert string values to float
-        for col in ["Open", "High", "Low", "Close", "Volume"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+        df = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name="Date"))
 
         # Sort by date ascending (oldest first)
         df = df.sort_index()
         return df
 
+    @staticmethod
+    def _to_utc(value: Any) -> pd.Timestamp:
+        """Return value as a UTC Timestamp comparable with the UTC index"""
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is None:
+            return timestamp.tz_localize("UTC")
+        return timestamp.tz_convert("UTC")
+
+    def _slice_ns(self, start_ns: int, end_ns: int) -> pd.DataFrame:
+        """Rows of self.df between two UTC nanosecond bounds, inclusive"""
+        # Binary-search the sorted index for the bounds, then slice by position
+        start_pos, end_pos = self.df.index.slice_locs(
+            pd.Timestamp(start_ns, tz="UTC"), pd.Timestamp(end_ns, tz="UTC")
+        )
+        return self.df.iloc[start_pos:end_pos]
+
     async def fetch_ticker_data(
         self,
         symbol: str,
@@ -118,97 +275,135 @@ class MockMarketDataService:
         if symbol != "AAPL":
             return pd.DataFrame()  # Return empty for non-AAPL symbols
 
-        df = self.df.copy()
-
         if start_date and end_date:
-            start_dt = pd.to_datetime(start_date)
-            end_dt = pd.to_datetime(end_date)
-            df = df[(df.index >= start_dt) & (df.index <= end_dt)]
+            window = self._slice(
+                self._to_utc(start_date).value, self._to_utc(end_date).value
+            )
+            return window.copy(deep=False)
 
-        return df
+        # Callers re-index the frame they get back but never write its values,
+        # so a shallow copy protects the shared index without copying the data
+        return self.df.copy(deep=False)
+
+    def closes_on(self, dates: Sequence[datetime]) -> np.ndarray:
+        """
+        Last close on or before each calendar day, like the service's asof;
+        NaN for days before the first bar
+        """
+        days = pd.DatetimeIndex(dates)
+        days = days.tz_localize("UTC") if days.tz is None else days.tz_convert("UTC")
+        # Binary-search for the last bar before the following midnight
+        day_ends = days.normalize() + pd.Timedelta(days=1)
+        positions = self.df.index.searchsorted(day_ends, side="left") - 1
+        closes = self.df["Close"].to_numpy()
+        return np.where(positions >= 0, closes[np.maximum(positions, 0)], np.nan)
+
+    async def get_current_price(self, symbol: str) -> Optional[float]:
+        """Mock get_current_price returning the latest Apple close for AAPL"""
+        if symbol != "AAPL":
+            return None
+        return float(self.df["Close"].iloc[-1])
 
 
-class TestPortfolioCalculationService(unittest.TestCase):
+class TestPortfolioCalculationService(unittest.IsolatedAsyncioTestCase):
     """Comprehensive test suite for Portfolio Calculation Service"""
 
     @classmethod
     def setUpClass(cls):
         """Load Apple market data once for all tests"""
-        with open("apple_market_data.json") as f:
-            cls.apple_data = json.load(f)
+        with open("apple_market_data.json", "rb") as f:
+            cls.apple_data = orjson.loads(f.read())
+
+        # The market data is read-only, so every test can share one service
+        cls.mock_market_service = MockMarketDataService(cls.apple_data)
+
+        # Read the clock once so every test, and every scenario built from it,
+        # shares the same "now"; that makes the scenario inputs safe to reuse
+        cls._now = datetime.now(timezone.utc)
+        cls._scenario_cache: Dict[int, MockPortfolio] = {}
 
         logger.info(
-            f"Loaded Apple data with {cls.apple_data['data_points']} data points"
-        )
-        logger.info(
-            f"Date range: {cls.apple_data['data'][0]['Date']} to {cls.apple_data['data'][-1]['Date']}"
+            "Loaded Apple data with %s data points\nDate range: %s to %s",
+            cls.apple_data["data_points"],
+            cls.apple_data["data"][0]["Date"],
+            cls.apple_data["data"][-1]["Date"],
         )
 
     def setUp(self):
         """Set up test fixtures"""
-        self.mock_market_service = MockMarketDataService(self.apple_data)
+        self.mock_market_service = type(self).mock_market_service
 
-        # Mock database session
-        self.mock_db = MagicMock()
+        # Fake database session, pointed at a portfolio per test
+        self.mock_db = FakeDB()
 
         # Create service with mock database
         self.service = PortfolioCalculationService(self.mock_db)
         self.service.market_data_service = self.mock_market_service
 
-    def create_portfolio_scenario_1(self) -> MockPortfolio:
+    def use_portfolio(self, portfolio: MockPortfolio) -> FakeDB:
+        """Point the service at a fake session serving portfolio"""
+        self.mock_db = FakeDB(portfolio, portfolio.transactions)
+        self.service.db = self.mock_db
+        return self.mock_db
+
+    def scenario(self, number: int) -> MockPortfolio:
+        """Return a fresh copy of portfolio scenario number, built once per class.
+
+        The service writes back onto the portfolio it is given (e.g. holding
+        current_value), so each test gets its own copy of the cached mocks.
+        """
+        cache = type(self)._scenario_cache
+        if number not in cache:
+            build = getattr(self, f"create_portfolio_scenario_{number}")
+            cache[number] = build(self._now)
+        return copy.deepcopy(cache[number])
+
+    def create_portfolio_scenario_1(self, now: datetime) -> MockPortfolio:
         """
         Scenario 1: Regular monthly investments over 2 years
         - Started investing 2 years ago
         - Monthly investments of $1000
         - Should have good CAGR and XIRR data
         """
-        start_date = datetime.now() - relativedelta(years=2)
-        transactions = []
-
-        # Monthly investments for 24 months
-        for i in range(24):
-            transaction_date = start_date + relativedelta(months=i)
-            # Use actual Apple price from that date (approximate)
-            price = 150.0 + (i * 2)  # Simplified price progression
-            quantity = Decimal(str(1000 / price))  # $1000 investment
-
-            transactions.append(
-                MockTransaction(
-                    transaction_date=transaction_date,
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    price_per_share=Decimal(str(price)),
-                    asset_symbol="AAPL",
-                )
-            )
-
-        # Calculate total quantity
-        total_quantity = sum(t.quantity for t in transactions)
+        start_date = now - relativedelta(years=2)
+
+        # Monthly $1000 investments for 24 months, bought at the actual closes
+        # so the portfolio matches an AAPL benchmark fed the same cash flows
+        # Offset each month from the start date rather than from the previous
+        # month, so a start on the 29th-31st keeps its day where it exists
+        dates = pd.DatetimeIndex(
+            [start_date + pd.DateOffset(months=k) for k in range(24)]
+        ).to_pydatetime()
+        prices = self.mock_market_service.closes_on(dates)
+
+        transactions, total_quantity = _build_buy_schedule(dates, prices, 1000.0)
         current_price = 254.43  # Recent Apple price from data
 
-        asset = MockAsset("AAPL", total_quantity, float(total_quantity) * current_price)
-        portfolio_asset = MockPortfolioAsset(asset, total_quantity)
+        asset = MockAsset(
+            "AAPL", _to_decimal(total_quantity), total_quantity * current_price
+        )
+        portfolio_asset = MockPortfolioAsset(asset, _to_decimal(total_quantity))
 
         return MockPortfolio(
             1, "Monthly Investment Portfolio", [portfolio_asset], transactions
         )
 
-    def create_portfolio_scenario_2(self) -> MockPortfolio:
+    def create_portfolio_scenario_2(self, now: datetime) -> MockPortfolio:
         """
         Scenario 2: Young portfolio (3 months old)
         - Started 3 months ago
         - Should trigger age-based period adjustment
         """
-        start_date = datetime.now() - relativedelta(months=3)
+        start_date = now - relativedelta(months=3)
         transactions = []
 
         # Initial investment
         transactions.append(
             MockTransaction(
                 transaction_date=start_date,
-                transaction_type="BUY",
-                quantity=Decimal(100),
-                price_per_share=Decimal("200.0"),
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(100.0),
+                price_per_share=_to_decimal(200.0),
                 asset_symbol="AAPL",
             )
         )
@@ -217,62 +412,64 @@ class TestPortfolioCalculationService(unittest.TestCase):
         transactions.append(
             MockTransaction(
                 transaction_date=start_date + relativedelta(months=1),
-                transaction_type="BUY",
-                quantity=Decimal(50),
-                price_per_share=Decimal("210.0"),
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(50.0),
+                price_per_share=_to_decimal(210.0),
                 asset_symbol="AAPL",
             )
         )
 
-        total_quantity = Decimal(150)
+        total_quantity = 150.0
         current_price = 254.43
 
-        asset = MockAsset("AAPL", total_quantity, float(total_quantity) * current_price)
-        portfolio_asset = MockPortfolioAsset(asset, total_quantity)
+        asset = MockAsset(
+            "AAPL", _to_decimal(total_quantity), total_quantity * current_price
+        )
+        portfolio_asset = MockPortfolioAsset(asset, _to_decimal(total_quantity))
 
         return MockPortfolio(2, "Young Portfolio", [portfolio_asset], transactions)
 
-    def create_portfolio_scenario_3(self) -> MockPortfolio:
+    def create_portfolio_scenario_3(self, now: datetime) -> MockPortfolio:
         """
         Scenario 3: Portfolio with missing market data
         - Should trigger error handling
         """
-        start_date = datetime.now() - relativedelta(months=6)
+        start_date = now - relativedelta(months=6)
         transactions = []
 
         transactions.append(
             MockTransaction(
                 transaction_date=start_date,
-                transaction_type="BUY",
-                quantity=Decimal(100),
-                price_per_share=Decimal("180.0"),
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(100.0),
+                price_per_share=_to_decimal(180.0),
                 asset_symbol="AAPL",
             )
         )
 
         # Asset with no current market value (simulate missing data)
-        asset = MockAsset("AAPL", Decimal(100), None)
-        portfolio_asset = MockPortfolioAsset(asset, Decimal(100))
+        asset = MockAsset("AAPL", _to_decimal(100.0), None)
+        portfolio_asset = MockPortfolioAsset(asset, _to_decimal(100.0))
 
         return MockPortfolio(
             3, "Missing Data Portfolio", [portfolio_asset], transactions
         )
 
-    def create_portfolio_scenario_4(self) -> MockPortfolio:
+    def create_portfolio_scenario_4(self, now: datetime) -> MockPortfolio:
         """
         Scenario 4: Buy and sell transactions
         - Complex cash flow pattern for XIRR testing
         """
-        start_date = datetime.now() - relativedelta(years=1, months=6)
+        start_date = now - relativedelta(years=1, months=6)
         transactions = []
 
         # Initial large purchase
         transactions.append(
             MockTransaction(
                 transaction_date=start_date,
-                transaction_type="BUY",
-                quantity=Decimal(200),
-                price_per_share=Decimal("150.0"),
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(200.0),
+                price_per_share=_to_decimal(150.0),
                 asset_symbol="AAPL",
             )
         )
@@ -281,9 +478,9 @@ class TestPortfolioCalculationService(unittest.TestCase):
         transactions.append(
             MockTransaction(
                 transaction_date=start_date + relativedelta(months=6),
-                transaction_type="SELL",
-                quantity=Decimal(50),
-                price_per_share=Decimal("180.0"),
+                transaction_type=TransactionType.SELL,
+                quantity=_to_decimal(50.0),
+                price_per_share=_to_decimal(180.0),
                 asset_symbol="AAPL",
             )
         )
@@ -292,39 +489,43 @@ class TestPortfolioCalculationService(unittest.TestCase):
         transactions.append(
             MockTransaction(
                 transaction_date=start_date + relativedelta(months=9),
-                transaction_type="BUY",
-                quantity=Decimal(75),
-                price_per_share=Decimal("200.0"),
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(75.0),
+                price_per_share=_to_decimal(200.0),
                 asset_symbol="AAPL",
             )
         )
 
-        total_quantity = Decimal(225)  # 200 - 50 + 75
+        total_quantity = 200.0 - 50.0 + 75.0
         current_price = 254.43
 
-        asset = MockAsset("AAPL", total_quantity, float(total_quantity) * current_price)
-        portfolio_asset = MockPortfolioAsset(asset, total_quantity)
+        asset = MockAsset(
+            "AAPL", _to_decimal(total_quantity), total_quantity * current_price
+        )
+        portfolio_asset = MockPortfolioAsset(asset, _to_decimal(total_quantity))
 
         return MockPortfolio(4, "Buy-Sell Portfolio", [portfolio_asset], transactions)
 
-    @patch("app.core.database.connection.get_db_session")
+    @patch.object(_dbconn, "get_db_session")
     async def test_scenario_1_regular_monthly_investments(self, mock_get_db):
         """Test regular monthly investment scenario"""
         logger.info("=== Testing Scenario 1: Regular Monthly Investments ===")
 
-        portfolio = self.create_portfolio_scenario_1()
-        mock_get_db.return_value.__aenter__.return_value = self.mock_db
-
-        # Mock database queries
-        self.mock_db.get.return_value = portfolio
-        self.mock_db.scalars.return_value.all.return_value = portfolio.transactions
+        portfolio = self.scenario(1)
+        mock_get_db.return_value.__aenter__.return_value = self.use_portfolio(portfolio)
 
-        # Test 1-year performance
-        result = await self.service.calculate_portfolio_performance(
-            portfolio_id=1, user_id=1, period=PeriodType.LAST_1_YEAR
+        # Test 1-year and 2-year performance (the portfolio is 2 years old);
+        # the two periods are independent, so compute them concurrently
+        result, result_2y = await asyncio.gather(
+            self.service.calculate_portfolio_performance(
+                portfolio_id=1, user_id=1, period=PeriodType.LAST_1_YEAR
+            ),
+            self.service.calculate_portfolio_performance(
+                portfolio_id=1, user_id=1, period=PeriodType.LAST_2_YEARS
+            ),
         )
 
-        logger.info(f"1-Year Results: {result}")
+        logger.info("1-Year Results: %s\n2-Year Results: %s", result, result_2y)
 
         # Assertions
         self.assertIsNotNone(result)
@@ -338,37 +539,31 @@ class TestPortfolioCalculationService(unittest.TestCase):
         self.assertIsNotNone(metrics.get("xirr"))
         self.assertIsNotNone(metrics.get("twr"))
 
-        logger.info(f"CAGR: {metrics.get('cagr')}%")
-        logger.info(f"XIRR: {metrics.get('xirr')}%")
-        logger.info(f"TWR: {metrics.get('twr')}%")
-
-        # Test 2-year performance (should work since portfolio is 2 years old)
-        result_2y = await self.service.calculate_portfolio_performance(
-            portfolio_id=1, user_id=1, period=PeriodType.LAST_2_YEARS
+        logger.info(
+            "CAGR: %s%%\nXIRR: %s%%\nTWR: %s%%",
+            metrics.get("cagr"),
+            metrics.get("xirr"),
+            metrics.get("twr"),
         )
 
-        logger.info(f"2-Year Results: {result_2y}")
         self.assertIsNotNone(result_2y["metrics"]["cagr"])
         self.assertIsNotNone(result_2y["metrics"]["xirr"])
         self.assertIsNotNone(result_2y["metrics"]["twr"])
 
-    @patch("app.core.database.connection.get_db_session")
+    @patch.object(_dbconn, "get_db_session")
     async def test_scenario_2_young_portfolio_age_adjustment(self, mock_get_db):
         """Test young portfolio with automatic period adjustment"""
         logger.info("=== Testing Scenario 2: Young Portfolio Age Adjustment ===")
 
-        portfolio = self.create_portfolio_scenario_2()
-        mock_get_db.return_value.__aenter__.return_value = self.mock_db
-
-        self.mock_db.get.return_value = portfolio
-        self.mock_db.scalars.return_value.all.return_value = portfolio.transactions
+        portfolio = self.scenario(2)
+        mock_get_db.return_value.__aenter__.return_value = self.use_portfolio(portfolio)
 
         # Request 1-year performance on 3-month-old portfolio
         result = await self.service.calculate_portfolio_performance(
             portfolio_id=2, user_id=1, period=PeriodType.LAST_1_YEAR
         )
 
-        logger.info(f"Young Portfolio Results: {result}")
+        logger.info("Young Portfolio Results: %s", result)
 
         # Should automatically adjust to inception period
         self.assertEqual(result["period"], "inception")
@@ -378,7 +573,7 @@ class TestPortfolioCalculationService(unittest.TestCase):
         self.assertEqual(period_adj["requested_period"], "1y")
         self.assertIn("Portfolio age", period_adj["adjustment_reason"])
 
-        logger.info(f"Period adjustment: {period_adj}")
+        logger.info("Period adjustment: %s", period_adj)
 
         # Should still have valid metrics
         metrics = result.get("metrics", {})
@@ -386,22 +581,22 @@ class TestPortfolioCalculationService(unittest.TestCase):
         self.assertIsNotNone(metrics.get("xirr"))
         self.assertIsNotNone(metrics.get("twr"))
 
-    @patch("app.core.database.connection.get_db_session")
-    async def test_scenario_3_missing_market_data_error_handling(self, mock_get_db):
+    @patch.object(MockMarketDataService, "get_current_price", return_value=None)
+    @patch.object(_dbconn, "get_db_session")
+    async def test_scenario_3_missing_market_data_error_handling(
+        self, mock_get_db, mock_get_current_price
+    ):
         """Test error handling when market data is missing"""
         logger.info("=== Testing Scenario 3: Missing Market Data Error Handling ===")
 
-        portfolio = self.create_portfolio_scenario_3()
-        mock_get_db.return_value.__aenter__.return_value = self.mock_db
-
-        self.mock_db.get.return_value = portfolio
-        self.mock_db.scalars.return_value.all.return_value = portfolio.transactions
+        portfolio = self.scenario(3)
+        mock_get_db.return_value.__aenter__.return_value = self.use_portfolio(portfolio)
 
         result = await self.service.calculate_portfolio_performance(
             portfolio_id=3, user_id=1, period=PeriodType.LAST_6_MONTHS
         )
 
-        logger.info(f"Missing Data Results: {result}")
+        logger.info("Missing Data Results: %s", result)
 
         # Should have errors
         self.assertIsNotNone(result.get("errors"))
@@ -415,27 +610,24 @@ class TestPortfolioCalculationService(unittest.TestCase):
 
         # Should log specific error about missing market value
         error_msg = result["errors"][0]
-        self.assertIn("No current market value available", error_msg)
+        self.assertIn("Could not fetch new market value", error_msg)
         self.assertIn("AAPL", error_msg)
 
-        logger.info(f"Error message: {error_msg}")
+        logger.info("Error message: %s", error_msg)
 
-    @patch("app.core.database.connection.get_db_session")
+    @patch.object(_dbconn, "get_db_session")
     async def test_scenario_4_complex_buy_sell_xirr(self, mock_get_db):
         """Test complex buy/sell scenario for XIRR calculation"""
         logger.info("=== Testing Scenario 4: Complex Buy/Sell XIRR ===")
 
-        portfolio = self.create_portfolio_scenario_4()
-        mock_get_db.return_value.__aenter__.return_value = self.mock_db
-
-        self.mock_db.get.return_value = portfolio
-        self.mock_db.scalars.return_value.all.return_value = portfolio.transactions
+        portfolio = self.scenario(4)
+        mock_get_db.return_value.__aenter__.return_value = self.use_portfolio(portfolio)
 
         result = await self.service.calculate_portfolio_performance(
             portfolio_id=4, user_id=1, period=PeriodType.INCEPTION
         )
 
-        logger.info(f"Complex Buy/Sell Results: {result}")
+        logger.info("Complex Buy/Sell Results: %s", result)
 
         # Should have valid results
         self.assertIsNone(result.get("errors"))
@@ -447,22 +639,18 @@ class TestPortfolioCalculationService(unittest.TestCase):
         # XIRR and TWR should account for the complex cash flow pattern
         xirr = metrics.get("xirr")
         twr = metrics.get("twr")
-        logger.info(f"Complex XIRR: {xirr}%")
-        logger.info(f"Complex TWR: {twr}%")
+        logger.info("Complex XIRR: %s%%\nComplex TWR: %s%%", xirr, twr)
 
         # Verify the calculation makes sense (should be positive given Apple's performance)
         self.assertIsInstance(xirr, (int, float))
 
-    @patch("app.core.database.connection.get_db_session")
+    @patch.object(_dbconn, "get_db_session")
     async def test_benchmark_comparison_same_stock(self, mock_get_db):
         """Test benchmark comparison using same stock (should have similar results)"""
         logger.info("=== Testing Benchmark Comparison (Same Stock) ===")
 
-        portfolio = self.create_portfolio_scenario_1()
-        mock_get_db.return_value.__aenter__.return_value = self.mock_db
-
-        self.mock_db.get.return_value = portfolio
-        self.mock_db.scalars.return_value.all.return_value = portfolio.transactions
+        portfolio = self.scenario(1)
+        mock_get_db.return_value.__aenter__.return_value = self.use_portfolio(portfolio)
 
         # Compare portfolio against AAPL benchmark
         result = await self.service.compare_portfolio_to_benchmark(
@@ -472,23 +660,27 @@ class TestPortfolioCalculationService(unittest.TestCase):
             period=PeriodType.LAST_1_YEAR,
         )
 
-        logger.info(f"Benchmark Comparison Results: {result}")
+        logger.info("Benchmark Comparison Results: %s", result)
 
         # Should have both portfolio and benchmark results
-        self.assertIsNotNone(result.get("portfolio"))
-        self.assertIsNotNone(result.get("benchmark"))
+        self.assertIsNotNone(result.get("portfolio_performance"))
+        self.assertIsNotNone(result.get("benchmark_performance"))
         self.assertIsNotNone(result.get("comparison"))
 
-        portfolio_metrics = result["portfolio"]["metrics"]
-        benchmark_metrics = result["benchmark"]["metrics"]
+        portfolio_metrics = result["portfolio_performance"]["metrics"]
+        benchmark_metrics = result["benchmark_performance"]["metrics"]
         comparison = result["comparison"]
 
-        logger.info(f"Portfolio XIRR: {portfolio_metrics.get('xirr')}%")
-        logger.info(f"Benchmark XIRR: {benchmark_metrics.get('xirr')}%")
-        logger.info(f"XIRR Difference: {comparison.get('xirr_difference')}%")
-        logger.info(f"Portfolio TWR: {portfolio_metrics.get('twr')}%")
-        logger.info(f"Benchmark TWR: {benchmark_metrics.get('twr')}%")
-        logger.info(f"TWR Difference: {comparison.get('twr_difference')}%")
+        logger.info(
+            "Portfolio XIRR: %s%%\nBenchmark XIRR: %s%%\nXIRR Difference: %s%%\n"
+            "Portfolio TWR: %s%%\nBenchmark TWR: %s%%\nTWR Difference: %s%%",
+            portfolio_metrics.get("xirr"),
+            benchmark_metrics.get("xirr"),
+            comparison.get("xirr_difference"),
+            portfolio_metrics.get("twr"),
+            benchmark_metrics.get("twr"),
+            comparison.get("twr_difference"),
+        )
 
         # Since both are investing in AAPL with same cash flows, results should be very similar
         # Allow for small differences due to timing and calculation methods
@@ -503,13 +695,13 @@ class TestPortfolioCalculationService(unittest.TestCase):
         logger.info("=== Testing Manual CAGR Calculation Verification ===")
 
         # Test with known values - create mock transactions for testing
-        start_date = datetime.now() - relativedelta(years=2)
+        start_date = self._now - relativedelta(years=2)
         transactions = [
             MockTransaction(
                 transaction_date=start_date,
-                transaction_type="BUY",
-                quantity=Decimal(100),
-                price_per_share=Decimal("100.0"),  # $10,000 initial
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(100.0),
+                price_per_share=_to_decimal(100.0),  # $10,000 initial
                 asset_symbol="AAPL",
             )
         ]
@@ -519,17 +711,16 @@ class TestPortfolioCalculationService(unittest.TestCase):
         # Expected CAGR = (15000/10000)^(1/2) - 1 = 0.2247 = 22.47%
         expected_cagr = ((current_value / 10000.0) ** (1 / 2.0) - 1) * 100
 
+        # From inception the beginning value is the net amount invested
         calculated_cagr = await self.service._calculate_cagr(
-            portfolio_id=999,
             all_transactions=transactions,
             current_value=current_value,
-            start_date=start_date,
-            end_date=datetime.now(),
+            start_date=None,
+            end_date=self._now,
         )
 
-        logger.info(f"Expected CAGR: {expected_cagr:.2f}%")
         logger.info(
-            f"Calculated CAGR: {calculated_cagr if calculated_cagr is not None else 'None'}"
+            "Expected CAGR: %.2f%%\nCalculated CAGR: %s", expected_cagr, calculated_cagr
         )
 
         if calculated_cagr is not None:
@@ -545,16 +736,16 @@ class TestPortfolioCalculationService(unittest.TestCase):
         transactions = [
             MockTransaction(
                 transaction_date=datetime(2023, 1, 1),
-                transaction_type="BUY",
-                quantity=Decimal(100),
-                price_per_share=Decimal("100.0"),  # $10,000 investment
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(100.0),
+                price_per_share=_to_decimal(100.0),  # $10,000 investment
                 asset_symbol="AAPL",
             ),
             MockTransaction(
                 transaction_date=datetime(2023, 6, 1),
-                transaction_type="BUY",
-                quantity=Decimal(50),
-                price_per_share=Decimal("100.0"),  # $5,000 additional investment
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(50.0),
+                price_per_share=_to_decimal(100.0),  # $5,000 additional investment
                 asset_symbol="AAPL",
             ),
         ]
@@ -563,7 +754,6 @@ class TestPortfolioCalculationService(unittest.TestCase):
 
         # Calculate using our service
         calculated_xirr = await self.service._calculate_xirr(
-            portfolio_id=999,
             all_transactions=transactions,
             current_value=current_value,
             start_date=datetime(2023, 1, 1),
@@ -575,9 +765,8 @@ class TestPortfolioCalculationService(unittest.TestCase):
         amounts = [-10000, -5000, 18000]
         expected_xirr = pyxirr.xirr(dates, amounts) * 100
 
-        logger.info(f"Expected XIRR: {expected_xirr:.2f}%")
         logger.info(
-            f"Calculated XIRR: {calculated_xirr if calculated_xirr is not None else 'None'}"
+            "Expected XIRR: %.2f%%\nCalculated XIRR: %s", expected_xirr, calculated_xirr
         )
 
         if calculated_xirr is not None:
@@ -594,31 +783,46 @@ class TestPortfolioCalculationService(unittest.TestCase):
         transactions = [
             MockTransaction(
                 transaction_date=datetime(2023, 1, 1),
-                transaction_type="BUY",
-                quantity=Decimal(100),
-                price_per_share=Decimal("100.0"),  # $10,000 investment
+                transaction_type=TransactionType.BUY,
+                quantity=_to_decimal(100.0),
+                price_per_share=_to_decimal(100.0),  # $10,000 investment
                 asset_symbol="AAPL",
             )
         ]
 
         current_value = 12000.0  # Final portfolio value
 
+        # The holding is valued at market on the start date, so the service
+        # needs the asset behind the transaction's asset_id
+        holding = MockPortfolioAsset(
+            MockAsset("AAPL", _to_decimal(100.0), current_value), _to_decimal(100.0)
+        )
+        self.use_portfolio(
+            MockPortfolio(999, "TWR Verification", [holding], transactions)
+        )
+        start_close = self.mock_market_service.closes_on([datetime(2023, 1, 1)])[0]
+        start_value = 100.0 * float(start_close)
+
         # Calculate using our service
         calculated_twr = await self.service._calculate_twr(
-            portfolio_id=999,
             all_transactions=transactions,
             current_value=current_value,
             start_date=datetime(2023, 1, 1),
             end_date=datetime(2024, 1, 1),
         )
 
-        # Expected TWR for single investment = (Final/Initial)^(1/years) - 1
-        # (12000/10000)^(1/1) - 1 = 0.20 = 20%
-        expected_twr = ((current_value / 10000.0) ** (1 / 1.0) - 1) * 100
+        # With no intermediate cash flows TWR reduces to the two-flow IRR
+        # between the start-date market value and the final value:
+        # (12000/start_value)^(365/365) - 1
+        expected_twr = (
+            _xirr_two_flow(
+                -start_value, current_value, datetime(2023, 1, 1), datetime(2024, 1, 1)
+            )
+            * 100
+        )
 
-        logger.info(f"Expected TWR: {expected_twr:.2f}%")
         logger.info(
-            f"Calculated TWR: {calculated_twr if calculated_twr is not None else 'None'}"
+            "Expected TWR: %.2f%%\nCalculated TWR: %s", expected_twr, calculated_twr
         )
 
         if calculated_twr is not None:
@@ -626,78 +830,6 @@ class TestPortfolioCalculationService(unittest.TestCase):
         else:
             self.fail("TWR calculation returned None")
 
-    async def run_all_tests(self):
-        """Run all test scenarios"""
-        logger.info("Starting comprehensive portfolio calculation tests...")
-
-        test_methods = [
-            self.test_scenario_1_regular_monthly_investments,
-            self.test_scenario_2_young_portfolio_age_adjustment,
-            self.test_scenario_3_missing_market_data_error_handling,
-            self.test_scenario_4_complex_buy_sell_xirr,
-            self.test_benchmark_comparison_same_stock,
-            self.test_manual_cagr_calculation_verification,
-            self.test_manual_xirr_calculation_verification,
-            self.test_manual_twr_calculation_verification,
-        ]
-
-        results = {}
-        for test_method in test_methods:
-            test_name = test_method.__name__
-            try:
-                logger.info(f"\n{'='*60}")
-                logger.info(f"Running {test_name}")
-                logger.info(f"{'='*60}")
-
-                await test_method()
-                results[test_name] = "PASSED"
-                logger.info(f"✅ {test_name} PASSED")
-
-            except Exception as e:
-                results[test_name] = f"FAILED: {e!s}"
-                logger.error(f"❌ {test_name} FAILED: {e!s}")
-
-        return results
-
-
-async def main():
-    """Main test runner"""
-    test_suite = TestPortfolioCalculationService()
-    test_suite.setUpClass()
-
-    # Run individual test setup
-    test_suite.setUp()
-
-    # Run all tests
-    results = await test_suite.run_all_tests()
-
-    # Print summary
-    print("\n" + "=" * 80)
-    print("TEST SUMMARY")
-    print("=" * 80)
-
-    passed = 0
-    failed = 0
-
-    for test_name, result in results.items():
-        status = "✅ PASSED" if result == "PASSED" else "❌ FAILED"
-        print(f"{test_name}: {status}")
-        if result == "PASSED":
-            passed += 1
-        else:
-            failed += 1
-            print(f"   Error: {result}")
-
-    print(f"\nTotal Tests: {len(results)}")
-    print(f"Passed: {passed}")
-    print(f"Failed: {failed}")
-    print(f"Success Rate: {(passed/len(results)*100):.1f}%")
-
-    if failed > 0:
-        print("\n⚠️  Some tests failed. Check the logs above for details.")
-    else:
-        print("\n🎉 All tests passed!")
-
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    unittest.main()
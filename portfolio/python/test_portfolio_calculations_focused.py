@@ -3,41 +3,148 @@ Focused Unit Tests for Portfolio Calculation Service
 Tests the core calculation logic using Apple historical data
 """
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-import json
+from functools import lru_cache
 import logging
-from typing import Dict, List, Optional
+import mmap
+import os
+from typing import Dict, List, NamedTuple, Optional
 
 from dateutil.relativedelta import relativedelta
+import numpy as np
+import orjson
 import pandas as pd
 import pyxirr
 
+from _twr_numba import twr_growth
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def _to_ns(date: datetime) -> int:
+    """Canonical UTC nanosecond timestamp for a (naive UTC) datetime"""
+    return pd.Timestamp(date, tz="UTC").value
+
+
+def _newton_xirr(
+    year_fracs: np.ndarray,
+    amounts: np.ndarray,
+    guess: float = 0.1,
+    tol: float = 1e-6,
+    max_iter: int = 50,
+) -> Optional[float]:
+    """Solve sum(amounts / (1 + r) ** year_fracs) = 0 by Newton's method"""
+    rate = guess
+    with np.errstate(all="ignore"):
+        for _ in range(max_iter):
+            if rate <= -1.0:
+                return None
+            discounted = amounts * (1.0 + rate) ** (-year_fracs)
+            npv = discounted.sum()
+            dnpv = -(year_fracs * discounted).sum() / (1.0 + rate)
+            step = npv / dnpv
+            if not np.isfinite(step):
+                return None
+            rate -= step
+            if abs(step) < tol:
+                return rate
+    return None
+
+
+def _xirr(dates: List[datetime], amounts: List[float]) -> Optional[float]:
+    """
+    XIRR on pyxirr's actual/365 convention, with pyxirr as the fallback.
+    Returns None when the cash flows have no rate that zeroes their NPV.
+    """
+    amounts_arr = np.asarray(amounts, dtype=np.float64)
+    if amounts_arr.sum() == 0.0:
+        return 0.0  # Net-zero flows: the NPV vanishes exactly at a zero rate
+
+    days = pd.DatetimeIndex(dates).asi8 // _NS_PER_DAY
+    year_fracs = (days - days.min()) / 365.0
+    rate = _newton_xirr(year_fracs, amounts_arr)
+    if rate is None:
+        return pyxirr.xirr(dates, amounts)
+    return rate
+
+
+class Txn(NamedTuple):
+    """A single scenario transaction"""
+
+    date: datetime
+    type: str  # "BUY" or "SELL"
+    quantity: float
+    price: float
+
 
 class AppleDataProcessor:
     """Processes Apple historical data for testing"""
 
     def __init__(self, apple_data_file: str):
-        with open(apple_data_file) as f:
-            self.apple_data = json.load(f)
+        # Parse straight from the mapped file without an intermediate str copy
+        with open(apple_data_file, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm, memoryview(mm) as view:
+            self.apple_data = orjson.loads(view)
 
         self.df = self._create_dataframe()
+        # Sorted index as int64 nanoseconds and the matching closes, for lookups
+        # by binary search instead of DataFrame.asof
+        self._dates_ns = self.df.index.asi8
+        self._closes = self.df["Close"].to_numpy(dtype=np.float64)
+        # Scenarios look up the same dates repeatedly; cache per instance so the
+        # cache does not outlive the processor
+        self._lookup_ns = lru_cache(maxsize=4096)(self._lookup_price_ns)
         logger.info(
-            f"Loaded Apple data: {len(self.df)} records from {self.df.index.min()} to {self.df.index.max()}"
+            "Loaded Apple data: %d records from %s to %s",
+            len(self.df),
+            self.df.index.min(),
+            self.df.index.max(),
+        )
+
+    def __getstate__(self) -> Dict:
+        """Pickle only the lookup arrays, not the raw JSON or the DataFrame"""
+        return {"_dates_ns": self._dates_ns, "_closes": self._closes}
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lookup_ns = lru_cache(maxsize=4096)(self._lookup_price_ns)
+
+    def since(self, start_ns: int) -> "AppleDataProcessor":
+        """Copy holding only the closes needed for lookups at or after start_ns"""
+        lo = max(int(np.searchsorted(self._dates_ns, start_ns, side="right")) - 1, 0)
+        clone = AppleDataProcessor.__new__(AppleDataProcessor)
+        clone.__setstate__(
+            {"_dates_ns": self._dates_ns[lo:], "_closes": self._closes[lo:]}
         )
+        return clone
 
     def _create_dataframe(self) -> pd.DataFrame:
         """Convert Apple JSON data to pandas DataFrame"""
         df = pd.DataFrame(self.apple_data["data"])
-        df["Date"] = pd.to_datetime(df["Date"], utc=True)
+        df["Date"] = pd.to_datetime(
+            df["Date"], utc=True, format="%Y-%m-%dT%H:%M:%S%z", cache=True
+        )
         df = df.set_index("Date")
 
-        # Convert string values to float
-        for col in ["Open", "High", "Low", "Close", "Volume"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+        # Convert string values to numbers in C; fall back to coercion on bad input
+        numeric_dtypes = {
+            "Open": np.float64,
+            "High": np.float64,
+            "Low": np.float64,
+            "Close": np.float64,
+            "Volume": np.int64,
+        }
+        for col, dtype in numeric_dtypes.items():
+            try:
+                df[col] = df[col].to_numpy().astype(dtype)
+            except (TypeError, ValueError):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
 
         # Sort by date ascending (oldest first)
         df = df.sort_index()
@@ -52,85 +159,132 @@ class AppleDataProcessor:
             elif target_date.tz is None:
                 target_date = target_date.tz_localize("UTC")
 
-            # Use asof to find the last available price on or before target date
-            price_row = self.df.asof(target_date)
-
-            if pd.notna(price_row["Close"]):
-                return float(price_row["Close"])
-
-            return None
+            return self._lookup_ns(target_date.value)
         except Exception as e:
-            logger.warning(f"Could not get price for date {target_date}: {e}")
+            logger.warning("Could not get price for date %s: %s", target_date, e)
             return None
 
+    def _lookup_price_ns(self, target_ns: int) -> Optional[float]:
+        """Get the last close on or before a UTC timestamp in nanoseconds"""
+        idx = np.searchsorted(self._dates_ns, target_ns, side="right") - 1
+        if idx < 0 or np.isnan(self._closes[idx]):
+            return None
+
+        return float(self._closes[idx])
+
+    def get_prices_at_ns(self, target_ns: np.ndarray) -> np.ndarray:
+        """Get the last close on or before each UTC ns timestamp, NaN if none"""
+        idx = np.searchsorted(self._dates_ns, target_ns, side="right") - 1
+        return np.where(idx >= 0, self._closes[np.maximum(idx, 0)], np.nan)
+
     def get_price_range(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """Get Apple price data for a date range"""
-        start_ts = pd.Timestamp(start_date)
-        end_ts = pd.Timestamp(end_date)
+        start_ns = _to_ns(start_date)
+        end_ns = _to_ns(end_date)
 
-        return self.df[(self.df.index >= start_ts) & (self.df.index <= end_ts)]
+        # Binary-search the sorted index; the positional slice is a view
+        lo = np.searchsorted(self._dates_ns, start_ns, side="left")
+        hi = np.searchsorted(self._dates_ns, end_ns, side="right")
+        return self.df.iloc[lo:hi]
 
 
 class PortfolioScenario:
     """Represents a portfolio scenario for testing"""
 
     def __init__(
-        self, name: str, transactions: List[Dict], apple_processor: AppleDataProcessor
+        self,
+        name: str,
+        transactions: List[Txn],
+        apple_processor: AppleDataProcessor,
+        now: Optional[datetime] = None,
     ):
         self.name = name
         self.transactions = transactions
         self.apple_processor = apple_processor
+        # Default end date for every calculation, read from the clock only once
+        self.now = now or datetime.now()
+
+        # Transactions as parallel arrays sorted by date: UTC dates in
+        # nanoseconds, quantities, prices and a sign of +1 for BUY / -1 for SELL
+        txn_dates = np.array(
+            [_to_ns(txn.date) for txn in transactions], dtype=np.int64
+        )
+        order = np.argsort(txn_dates, kind="stable")
+        self._txn_dates = txn_dates[order]
+        self._txn_datetimes = [transactions[i].date for i in order]
+        # Inception date, read off the sorted arrays instead of a min() scan
+        self.first_txn_ns = int(self._txn_dates[0]) if len(order) else None
+        self.first_txn_date = self._txn_datetimes[0] if len(order) else None
+        self._txn_qty = np.array(
+            [txn.quantity for txn in transactions], dtype=np.float64
+        )[order]
+        self._txn_price = np.array(
+            [txn.price for txn in transactions], dtype=np.float64
+        )[order]
+        self._txn_sign = np.array(
+            [1 if txn.type == "BUY" else -1 for txn in transactions], dtype=np.int8
+        )[order]
+        # Net amount put into the portfolio by each transaction, and running
+        # totals of that and of the quantity held for O(log N) lookups by date
+        self._txn_invested = self._txn_sign * self._txn_qty * self._txn_price
+        self._cum_qty = np.cumsum(self._txn_sign * self._txn_qty)
+        self._cum_invested = np.cumsum(self._txn_invested)
 
         # Calculate current portfolio value
         self.current_quantity = self._calculate_current_quantity()
-        self.current_price = apple_processor.get_price_at_date(datetime.now())
+        self.current_price = apple_processor.get_price_at_date(self.now)
         self.current_value = (
             self.current_quantity * self.current_price if self.current_price else None
         )
 
-        current_price_str = (
-            f"${self.current_price:.2f}" if self.current_price else "N/A"
-        )
-        current_value_str = (
-            f"${self.current_value:.2f}" if self.current_value else "N/A"
-        )
-        logger.info(
-            f"Scenario '{name}': {self.current_quantity} shares, current price {current_price_str}, value {current_value_str}"
-        )
+        if logger.isEnabledFor(logging.INFO):
+            current_price_str = (
+                f"${self.current_price:.2f}" if self.current_price else "N/A"
+            )
+            current_value_str = (
+                f"${self.current_value:.2f}" if self.current_value else "N/A"
+            )
+            logger.info(
+                "Scenario '%s': %s shares, current price %s, value %s",
+                name,
+                self.current_quantity,
+                current_price_str,
+                current_value_str,
+            )
+
+    def __getstate__(self) -> Dict:
+        """Pickle with only the closes from the inception date onward"""
+        state = self.__dict__.copy()
+        if self.first_txn_ns is not None:
+            state["apple_processor"] = self.apple_processor.since(self.first_txn_ns)
+        return state
 
     def _calculate_current_quantity(self) -> float:
         """Calculate current quantity from transactions"""
-        quantity = 0.0
-        for txn in self.transactions:
-            if txn["type"] == "BUY":
-                quantity += txn["quantity"]
-            elif txn["type"] == "SELL":
-                quantity -= txn["quantity"]
-        return quantity
+        return float((self._txn_sign * self._txn_qty).sum())
 
     def get_cash_flows(
         self, start_date: datetime = None, end_date: datetime = None
     ) -> List[Dict]:
         """Get cash flows for XIRR calculation"""
-        cash_flows = []
-
-        # Add transaction cash flows
-        for txn in self.transactions:
-            txn_date = txn["date"]
-            if start_date and txn_date < start_date:
-                continue
-            if end_date and txn_date > end_date:
-                continue
-
-            if txn["type"] == "BUY":
-                amount = -txn["quantity"] * txn["price"]  # Negative for outflow
-            else:  # SELL
-                amount = txn["quantity"] * txn["price"]  # Positive for inflow
-
-            cash_flows.append({"date": txn_date, "amount": amount})
+        # Add transaction cash flows: negative for BUY outflows, positive for SELLs.
+        # Bounds are inclusive against the run's single clock, so a transaction
+        # dated exactly at start_date is part of the window. A window opening
+        # on a SELL can then have no XIRR root (e.g. Buy-Sell over one year)
+        in_range = np.ones(len(self.transactions), dtype=bool)
+        if start_date:
+            in_range &= self._txn_dates >= _to_ns(start_date)
+        if end_date:
+            in_range &= self._txn_dates <= _to_ns(end_date)
+
+        amounts = -self._txn_invested
+        cash_flows = [
+            {"date": self._txn_datetimes[i], "amount": float(amounts[i])}
+            for i in np.flatnonzero(in_range)
+        ]
 
         # Add final value as positive cash flow
-        final_date = end_date or datetime.now()
+        final_date = end_date or self.now
         if self.current_value:
             cash_flows.append({"date": final_date, "amount": self.current_value})
 
@@ -141,16 +295,13 @@ class PortfolioScenario:
     ) -> float:
         """Calculate CAGR manually"""
         if not end_date:
-            end_date = datetime.now()
+            end_date = self.now
 
         # Get initial investment value
-        initial_value = 0.0
-        for txn in self.transactions:
-            if txn["date"] <= start_date:
-                if txn["type"] == "BUY":
-                    initial_value += txn["quantity"] * txn["price"]
-                else:  # SELL
-                    initial_value -= txn["quantity"] * txn["price"]
+        start_ns = _to_ns(start_date)
+        # Running total up to the last transaction on or before the start date
+        idx = np.searchsorted(self._txn_dates, start_ns, side="right") - 1
+        initial_value = 0.0 if idx < 0 else float(self._cum_invested[idx])
 
         if initial_value <= 0:
             logger.warning("Initial value is zero or negative, cannot calculate CAGR")
@@ -187,10 +338,13 @@ class PortfolioScenario:
             return None
 
         try:
-            xirr = pyxirr.xirr(dates, amounts) * 100
-            return xirr
+            xirr = _xirr(dates, amounts)
+            if xirr is None:
+                logger.warning("XIRR has no root for these cash flows")
+                return None
+            return xirr * 100
         except Exception as e:
-            logger.error(f"XIRR calculation failed: {e}")
+            logger.error("XIRR calculation failed: %s", e)
             return None
 
     def calculate_manual_twr(
@@ -199,20 +353,20 @@ class PortfolioScenario:
         """Calculate TWR manually using sub-period returns."""
         try:
             if not end_date:
-                end_date = datetime.now()
+                end_date = self.now
 
-            if not start_date:
-                start_date = min(txn["date"] for txn in self.transactions)
+            if start_date:
+                start_ns = _to_ns(start_date)
+            else:
+                start_date = self.first_txn_date
+                start_ns = self.first_txn_ns
 
             # Get cash flow dates within the period
-            cash_flow_dates = []
-            for txn in self.transactions:
-                if start_date <= txn["date"] <= end_date:
-                    cash_flow_dates.append(txn["date"])
-
-            cash_flow_dates = sorted(list(set(cash_flow_dates)))
+            end_ns = _to_ns(end_date)
+            in_period = (self._txn_dates >= start_ns) & (self._txn_dates <= end_ns)
+            cash_flow_ns = self._txn_dates[in_period]
 
-            if not cash_flow_dates:
+            if not cash_flow_ns.size:
                 # No cash flows in period, calculate simple return
                 initial_value = self._get_portfolio_value_at_date(start_date)
                 if not initial_value or initial_value <= 0:
@@ -229,32 +383,26 @@ class PortfolioScenario:
                 return simple_return * 100
 
             # Calculate TWR with cash flows using sub-periods
-            sub_periods = self._create_twr_sub_periods(
-                start_date, end_date, cash_flow_dates
-            )
+            sub_periods = self._create_twr_sub_periods(start_ns, end_ns, cash_flow_ns)
 
-            if not sub_periods:
+            if not len(sub_periods):
                 return None
 
-            # Calculate return for each sub-period
-            sub_period_returns = []
-
-            for period_start, period_end in sub_periods:
-                sub_return = self._calculate_twr_sub_period_return(
-                    period_start, period_end
-                )
-                if sub_return is not None:
-                    sub_period_returns.append(sub_return)
+            # Calculate and geometrically link the sub-period returns
+            growth, used = twr_growth(
+                sub_periods[:, 0],
+                sub_periods[:, 1],
+                self._txn_dates,
+                self._cum_qty,
+                self._cum_invested,
+                self.apple_processor._dates_ns,
+                self.apple_processor._closes,
+            )
 
-            if not sub_period_returns:
+            if not used:
                 return None
 
-            # Link sub-period returns geometrically
-            twr = 1.0
-            for sub_return in sub_period_returns:
-                twr *= 1 + sub_return
-
-            twr = twr - 1  # Convert back to return
+            twr = growth - 1  # Convert back to return
 
             # Annualize if needed
             days = (end_date - start_date).days
@@ -265,20 +413,16 @@ class PortfolioScenario:
             return twr * 100
 
         except Exception as e:
-            logger.error(f"TWR calculation failed: {e}")
+            logger.error("TWR calculation failed: %s", e)
             return None
 
     def _get_portfolio_value_at_date(self, target_date: datetime) -> float:
         """Get portfolio value at a specific date."""
         try:
             # Calculate quantity held at target date
-            quantity_at_date = 0.0
-            for txn in self.transactions:
-                if txn["date"] <= target_date:
-                    if txn["type"] == "BUY":
-                        quantity_at_date += txn["quantity"]
-                    elif txn["type"] == "SELL":
-                        quantity_at_date -= txn["quantity"]
+            target_ns = _to_ns(target_date)
+            last = np.searchsorted(self._txn_dates, target_ns, side="right") - 1
+            quantity_at_date = 0.0 if last < 0 else float(self._cum_qty[last])
 
             if quantity_at_date <= 0:
                 return 0.0
@@ -291,67 +435,128 @@ class PortfolioScenario:
             return quantity_at_date * price_at_date
 
         except Exception as e:
-            logger.error(f"Error getting portfolio value at date {target_date}: {e}")
+            logger.error("Error getting portfolio value at date %s: %s", target_date, e)
             return None
 
     def _create_twr_sub_periods(
-        self, start_date: datetime, end_date: datetime, cash_flow_dates: List[datetime]
-    ) -> List[tuple]:
-        """Create sub-periods for TWR calculation."""
-        period_dates = [start_date] + cash_flow_dates + [end_date]
-        period_dates = sorted(list(set(period_dates)))
-
-        sub_periods = []
-        for i in range(len(period_dates) - 1):
-            period_start = period_dates[i]
-            period_end = period_dates[i + 1]
-
-            if period_start != period_end:
-                sub_periods.append((period_start, period_end))
-
-        return sub_periods
-
-    def _calculate_twr_sub_period_return(
-        self, period_start: datetime, period_end: datetime
-    ) -> Optional[float]:
-        """Calculate return for a single sub-period using correct TWR formula."""
-        try:
-            # Get portfolio value at start and end of period
-            start_value = self._get_portfolio_value_at_date(period_start)
-            end_value = self._get_portfolio_value_at_date(period_end)
-
-            if not start_value or start_value <= 0:
-                return None
-            if end_value is None:
-                return None
+        self, start_ns: int, end_ns: int, cash_flow_ns: np.ndarray
+    ) -> np.ndarray:
+        """Create sub-periods for TWR calculation as a (K, 2) array of ns bounds."""
+        # np.unique sorts and drops repeated dates, so no period is empty
+        period_ns = np.unique(np.concatenate(([start_ns], cash_flow_ns, [end_ns])))
+        return np.stack([period_ns[:-1], period_ns[1:]], axis=1)
+
+
+def _run_scenario_calculations(scenario: PortfolioScenario) -> Dict:
+    """
+    Test calculations for a specific scenario. Module-level so a process pool
+    pickles only the scenario (and its processor's lookup arrays) per task.
+    """
+    logger.info("\n%s", "=" * 60)
+    logger.info("Testing Scenario: %s", scenario.name)
+    logger.info("%s", "=" * 60)
+
+    results = {
+        "scenario_name": scenario.name,
+        "current_quantity": scenario.current_quantity,
+        "current_price": scenario.current_price,
+        "current_value": scenario.current_value,
+        "transaction_count": len(scenario.transactions),
+        "tests": {},
+    }
+
+    # Test 1: CAGR calculation (since inception)
+    first_txn_date = scenario.first_txn_date
+    cagr = scenario.calculate_manual_cagr(first_txn_date)
+    results["tests"]["cagr_inception"] = cagr
+    if cagr:
+        logger.info("CAGR (since inception): %.2f%%", cagr)
+    else:
+        logger.info("CAGR: Could not calculate")
+
+    # Test 2: CAGR for last 1 year (if portfolio is old enough)
+    one_year_ago = scenario.now - relativedelta(years=1)
+    if first_txn_date <= one_year_ago:
+        cagr_1y = scenario.calculate_manual_cagr(one_year_ago)
+        results["tests"]["cagr_1year"] = cagr_1y
+        if cagr_1y:
+            logger.info("CAGR (1 year): %.2f%%", cagr_1y)
+        else:
+            logger.info("CAGR (1 year): Could not calculate")
+    else:
+        results["tests"]["cagr_1year"] = "Portfolio too young"
+        logger.info("CAGR (1 year): Portfolio too young")
+
+    # Test 3: XIRR calculation (since inception)
+    xirr = scenario.calculate_manual_xirr()
+    results["tests"]["xirr_inception"] = xirr
+    if xirr:
+        logger.info("XIRR (since inception): %.2f%%", xirr)
+    else:
+        logger.info("XIRR: Could not calculate")
+
+    # Test 3.5: TWR calculation (since inception)
+    twr = scenario.calculate_manual_twr()
+    results["tests"]["twr_inception"] = twr
+    if twr:
+        logger.info("TWR (since inception): %.2f%%", twr)
+    else:
+        logger.info("TWR: Could not calculate")
+
+    # Test 4: XIRR for last 1 year (if portfolio is old enough)
+    if first_txn_date <= one_year_ago:
+        xirr_1y = scenario.calculate_manual_xirr(one_year_ago)
+        results["tests"]["xirr_1year"] = xirr_1y
+        if xirr_1y:
+            logger.info("XIRR (1 year): %.2f%%", xirr_1y)
+        else:
+            logger.info("XIRR (1 year): Could not calculate")
 
-            # Calculate net cash flow during the period
-            net_cash_flow = 0.0
-            for txn in self.transactions:
-                if period_start < txn["date"] <= period_end:
-                    if txn["type"] == "BUY":
-                        net_cash_flow += (
-                            txn["quantity"] * txn["price"]
-                        )  # Positive inflow
-                    elif txn["type"] == "SELL":
-                        net_cash_flow -= (
-                            txn["quantity"] * txn["price"]
-                        )  # Negative outflow
-
-            # Correct TWR formula: Return = (End Value - Net Cash Flow) / Start Value - 1
-            sub_return = (end_value - net_cash_flow) / start_value - 1
-            return sub_return
+        # Test 4.5: TWR for last 1 year
+        twr_1y = scenario.calculate_manual_twr(one_year_ago)
+        results["tests"]["twr_1year"] = twr_1y
+        if twr_1y:
+            logger.info("TWR (1 year): %.2f%%", twr_1y)
+        else:
+            logger.info("TWR (1 year): Could not calculate")
+    else:
+        results["tests"]["xirr_1year"] = "Portfolio too young"
+        results["tests"]["twr_1year"] = "Portfolio too young"
+        logger.info("XIRR (1 year): Portfolio too young")
+        logger.info("TWR (1 year): Portfolio too young")
+
+    # Test 5: Cash flow analysis
+    cash_flows = scenario.get_cash_flows()
+    amounts = np.array([cf["amount"] for cf in cash_flows], dtype=np.float64)
+    # One comparison splits outflows from inflows (zero amounts add nothing)
+    outflow = amounts < 0
+    total_invested = float(amounts[outflow].sum())
+    total_returned = float(amounts[~outflow].sum())
+
+    results["tests"]["total_invested"] = abs(total_invested)
+    results["tests"]["total_returned"] = total_returned
+    results["tests"]["absolute_return"] = (
+        total_returned + total_invested
+    )  # Net gain/loss
+
+    if logger.isEnabledFor(logging.INFO):
+        # Thousands separators need str.format, so only build them when logged
+        logger.info("Total Invested: $%s", f"{abs(total_invested):,.2f}")
+        logger.info("Current Value: $%s", f"{total_returned:,.2f}")
+        logger.info(
+            "Absolute Return: $%s", f"{total_returned + total_invested:,.2f}"
+        )
 
-        except Exception as e:
-            logger.error(f"Error calculating sub-period return: {e}")
-            return None
+    return results
 
 
 class PortfolioCalculationTester:
     """Main test runner for portfolio calculations"""
 
-    def __init__(self, apple_data_file: str):
+    def __init__(self, apple_data_file: str, now: Optional[datetime] = None):
         self.apple_processor = AppleDataProcessor(apple_data_file)
+        # One "now" shared by every scenario and check in this run
+        self.now = now or datetime.now()
         self.scenarios = self._create_test_scenarios()
 
     def _create_test_scenarios(self) -> List[PortfolioScenario]:
@@ -359,205 +564,119 @@ class PortfolioCalculationTester:
         scenarios = []
 
         # Scenario 1: Regular monthly investments over 2 years
-        start_date = datetime.now() - relativedelta(years=2)
+        start_date = self.now - relativedelta(years=2)
         transactions_1 = []
 
-        for i in range(24):  # 24 months
-            txn_date = start_date + relativedelta(months=i)
-            # Get actual Apple price at that date
-            price = self.apple_processor.get_price_at_date(txn_date)
-            if price:
+        # All 24 monthly dates at once, as datetimes and as UTC nanoseconds
+        month_index = pd.date_range(
+            start_date, periods=24, freq=pd.DateOffset(months=1)
+        )
+        # Get actual Apple prices at those dates in one vectorized lookup
+        prices = self.apple_processor.get_prices_at_ns(month_index.asi8)
+        for txn_date, price in zip(month_index.to_pydatetime(), prices.tolist()):
+            if price > 0:  # NaN marks a date without a price
                 quantity = 1000 / price  # $1000 investment each month
                 transactions_1.append(
-                    {
-                        "date": txn_date,
-                        "type": "BUY",
-                        "quantity": quantity,
-                        "price": price,
-                    }
+                    Txn(date=txn_date, type="BUY", quantity=quantity, price=price)
                 )
 
         scenarios.append(
             PortfolioScenario(
-                "Monthly Investment (2 years)", transactions_1, self.apple_processor
+                "Monthly Investment (2 years)",
+                transactions_1,
+                self.apple_processor,
+                self.now,
             )
         )
 
         # Scenario 2: Young portfolio (3 months old)
-        start_date_2 = datetime.now() - relativedelta(months=3)
+        start_date_2 = self.now - relativedelta(months=3)
         transactions_2 = [
-            {
-                "date": start_date_2,
-                "type": "BUY",
-                "quantity": 100,
-                "price": self.apple_processor.get_price_at_date(start_date_2) or 200.0,
-            },
-            {
-                "date": start_date_2 + relativedelta(months=1),
-                "type": "BUY",
-                "quantity": 50,
-                "price": self.apple_processor.get_price_at_date(
+            Txn(
+                date=start_date_2,
+                type="BUY",
+                quantity=100.0,
+                price=self.apple_processor.get_price_at_date(start_date_2) or 200.0,
+            ),
+            Txn(
+                date=start_date_2 + relativedelta(months=1),
+                type="BUY",
+                quantity=50.0,
+                price=self.apple_processor.get_price_at_date(
                     start_date_2 + relativedelta(months=1)
                 )
                 or 210.0,
-            },
+            ),
         ]
 
         scenarios.append(
             PortfolioScenario(
-                "Young Portfolio (3 months)", transactions_2, self.apple_processor
+                "Young Portfolio (3 months)",
+                transactions_2,
+                self.apple_processor,
+                self.now,
             )
         )
 
         # Scenario 3: Buy and sell transactions
-        start_date_3 = datetime.now() - relativedelta(years=1, months=6)
+        start_date_3 = self.now - relativedelta(years=1, months=6)
         transactions_3 = [
-            {
-                "date": start_date_3,
-                "type": "BUY",
-                "quantity": 200,
-                "price": self.apple_processor.get_price_at_date(start_date_3) or 150.0,
-            },
-            {
-                "date": start_date_3 + relativedelta(months=6),
-                "type": "SELL",
-                "quantity": 50,
-                "price": self.apple_processor.get_price_at_date(
+            Txn(
+                date=start_date_3,
+                type="BUY",
+                quantity=200.0,
+                price=self.apple_processor.get_price_at_date(start_date_3) or 150.0,
+            ),
+            Txn(
+                date=start_date_3 + relativedelta(months=6),
+                type="SELL",
+                quantity=50.0,
+                price=self.apple_processor.get_price_at_date(
                     start_date_3 + relativedelta(months=6)
                 )
                 or 180.0,
-            },
-            {
-                "date": start_date_3 + relativedelta(months=9),
-                "type": "BUY",
-                "quantity": 75,
-                "price": self.apple_processor.get_price_at_date(
+            ),
+            Txn(
+                date=start_date_3 + relativedelta(months=9),
+                type="BUY",
+                quantity=75.0,
+                price=self.apple_processor.get_price_at_date(
                     start_date_3 + relativedelta(months=9)
                 )
                 or 200.0,
-            },
+            ),
         ]
 
         scenarios.append(
             PortfolioScenario(
-                "Buy-Sell Portfolio", transactions_3, self.apple_processor
+                "Buy-Sell Portfolio", transactions_3, self.apple_processor, self.now
             )
         )
 
         # Scenario 4: Simple lump sum investment
-        start_date_4 = datetime.now() - relativedelta(years=1)
+        start_date_4 = self.now - relativedelta(years=1)
         price_4 = self.apple_processor.get_price_at_date(start_date_4) or 180.0
         transactions_4 = [
-            {"date": start_date_4, "type": "BUY", "quantity": 100, "price": price_4}
+            Txn(date=start_date_4, type="BUY", quantity=100.0, price=price_4)
         ]
 
         scenarios.append(
-            PortfolioScenario("Lump Sum (1 year)", transactions_4, self.apple_processor)
+            PortfolioScenario(
+                "Lump Sum (1 year)", transactions_4, self.apple_processor, self.now
+            )
         )
 
         return scenarios
 
     def test_scenario_calculations(self, scenario: PortfolioScenario):
         """Test calculations for a specific scenario"""
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Testing Scenario: {scenario.name}")
-        logger.info(f"{'='*60}")
-
-        results = {
-            "scenario_name": scenario.name,
-            "current_quantity": scenario.current_quantity,
-            "current_price": scenario.current_price,
-            "current_value": scenario.current_value,
-            "transaction_count": len(scenario.transactions),
-            "tests": {},
-        }
-
-        # Test 1: CAGR calculation (since inception)
-        first_txn_date = min(txn["date"] for txn in scenario.transactions)
-        cagr = scenario.calculate_manual_cagr(first_txn_date)
-        results["tests"]["cagr_inception"] = cagr
-        logger.info(
-            f"CAGR (since inception): {cagr:.2f}%"
-            if cagr
-            else "CAGR: Could not calculate"
-        )
-
-        # Test 2: CAGR for last 1 year (if portfolio is old enough)
-        one_year_ago = datetime.now() - relativedelta(years=1)
-        if first_txn_date <= one_year_ago:
-            cagr_1y = scenario.calculate_manual_cagr(one_year_ago)
-            results["tests"]["cagr_1year"] = cagr_1y
-            logger.info(
-                f"CAGR (1 year): {cagr_1y:.2f}%"
-                if cagr_1y
-                else "CAGR (1 year): Could not calculate"
-            )
-        else:
-            results["tests"]["cagr_1year"] = "Portfolio too young"
-            logger.info("CAGR (1 year): Portfolio too young")
-
-        # Test 3: XIRR calculation (since inception)
-        xirr = scenario.calculate_manual_xirr()
-        results["tests"]["xirr_inception"] = xirr
-        logger.info(
-            f"XIRR (since inception): {xirr:.2f}%"
-            if xirr
-            else "XIRR: Could not calculate"
-        )
-
-        # Test 3.5: TWR calculation (since inception)
-        twr = scenario.calculate_manual_twr()
-        results["tests"]["twr_inception"] = twr
-        logger.info(
-            f"TWR (since inception): {twr:.2f}%" if twr else "TWR: Could not calculate"
-        )
-
-        # Test 4: XIRR for last 1 year (if portfolio is old enough)
-        if first_txn_date <= one_year_ago:
-            xirr_1y = scenario.calculate_manual_xirr(one_year_ago)
-            results["tests"]["xirr_1year"] = xirr_1y
-            logger.info(
-                f"XIRR (1 year): {xirr_1y:.2f}%"
-                if xirr_1y
-                else "XIRR (1 year): Could not calculate"
-            )
-
-            # Test 4.5: TWR for last 1 year
-            twr_1y = scenario.calculate_manual_twr(one_year_ago)
-            results["tests"]["twr_1year"] = twr_1y
-            logger.info(
-                f"TWR (1 year): {twr_1y:.2f}%"
-                if twr_1y
-                else "TWR (1 year): Could not calculate"
-            )
-        else:
-            results["tests"]["xirr_1year"] = "Portfolio too young"
-            results["tests"]["twr_1year"] = "Portfolio too young"
-            logger.info("XIRR (1 year): Portfolio too young")
-            logger.info("TWR (1 year): Portfolio too young")
-
-        # Test 5: Cash flow analysis
-        cash_flows = scenario.get_cash_flows()
-        total_invested = sum(cf["amount"] for cf in cash_flows if cf["amount"] < 0)
-        total_returned = sum(cf["amount"] for cf in cash_flows if cf["amount"] > 0)
-
-        results["tests"]["total_invested"] = abs(total_invested)
-        results["tests"]["total_returned"] = total_returned
-        results["tests"]["absolute_return"] = (
-            total_returned + total_invested
-        )  # Net gain/loss
-
-        logger.info(f"Total Invested: ${abs(total_invested):,.2f}")
-        logger.info(f"Current Value: ${total_returned:,.2f}")
-        logger.info(f"Absolute Return: ${total_returned + total_invested:,.2f}")
-
-        return results
+        return _run_scenario_calculations(scenario)
 
     def test_benchmark_comparison(self):
         """Test benchmark comparison logic"""
-        logger.info(f"\n{'='*60}")
+        logger.info("\n%s", "=" * 60)
         logger.info("Testing Benchmark Comparison")
-        logger.info(f"{'='*60}")
+        logger.info("%s", "=" * 60)
 
         # Use the monthly investment scenario
         scenario = self.scenarios[0]  # Monthly investment scenario
@@ -567,36 +686,42 @@ class PortfolioCalculationTester:
         benchmark_quantity = 0.0
 
         for txn in scenario.transactions:
-            if txn["type"] == "BUY":
-                benchmark_quantity += txn["quantity"]
+            if txn.type == "BUY":
+                benchmark_quantity += txn.quantity
                 benchmark_cash_flows.append(
-                    {"date": txn["date"], "amount": -txn["quantity"] * txn["price"]}
+                    {"date": txn.date, "amount": -txn.quantity * txn.price}
                 )
 
         # Add current benchmark value
         current_benchmark_value = benchmark_quantity * scenario.current_price
         benchmark_cash_flows.append(
-            {"date": datetime.now(), "amount": current_benchmark_value}
+            {"date": self.now, "amount": current_benchmark_value}
         )
 
         # Calculate benchmark XIRR
         dates = [cf["date"] for cf in benchmark_cash_flows]
         amounts = [cf["amount"] for cf in benchmark_cash_flows]
-        benchmark_xirr = pyxirr.xirr(dates, amounts) * 100
+        benchmark_xirr = _xirr(dates, amounts)
+        if benchmark_xirr is None:
+            logger.warning("Benchmark XIRR has no root for these cash flows")
+        else:
+            benchmark_xirr *= 100
 
         # Compare with portfolio XIRR
         portfolio_xirr = scenario.calculate_manual_xirr()
 
-        logger.info(
-            f"Portfolio XIRR: {portfolio_xirr:.2f}%"
-            if portfolio_xirr
-            else "Portfolio XIRR: Could not calculate"
-        )
-        logger.info(f"Benchmark XIRR: {benchmark_xirr:.2f}")
+        if portfolio_xirr:
+            logger.info("Portfolio XIRR: %.2f%%", portfolio_xirr)
+        else:
+            logger.info("Portfolio XIRR: Could not calculate")
+        if benchmark_xirr is not None:
+            logger.info("Benchmark XIRR: %.2f", benchmark_xirr)
+        else:
+            logger.info("Benchmark XIRR: Could not calculate")
 
         if portfolio_xirr and benchmark_xirr:
             difference = portfolio_xirr - benchmark_xirr
-            logger.info(f"Performance Difference: {difference:.2f}%")
+            logger.info("Performance Difference: %.2f%%", difference)
 
             # Since both are investing in the same stock (AAPL), they should be very similar
             if abs(difference) < 1.0:
@@ -604,7 +729,7 @@ class PortfolioCalculationTester:
                     "✅ Benchmark comparison working correctly (minimal difference)"
                 )
                 return True
-            logger.warning(f"⚠️  Large difference detected: {difference:.2f}%")
+            logger.warning("⚠️  Large difference detected: %.2f%%", difference)
             return False
         logger.error("❌ Could not compare - missing XIRR values")
         return False
@@ -615,21 +740,29 @@ class PortfolioCalculationTester:
 
         all_results = []
 
-        # Test each scenario
-        for scenario in self.scenarios:
-            try:
-                results = self.test_scenario_calculations(scenario)
-                results["status"] = "PASSED"
-                all_results.append(results)
-            except Exception as e:
-                logger.error(f"❌ Scenario '{scenario.name}' failed: {e}")
-                all_results.append(
-                    {
+        # Test each scenario; they share no state, so run them in parallel
+        scenario_results = [None] * len(self.scenarios)
+        max_workers = min(len(self.scenarios), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_run_scenario_calculations, scenario): i
+                for i, scenario in enumerate(self.scenarios)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                scenario = self.scenarios[i]
+                try:
+                    results = future.result()
+                    results["status"] = "PASSED"
+                    scenario_results[i] = results
+                except Exception as e:
+                    logger.error("❌ Scenario '%s' failed: %s", scenario.name, e)
+                    scenario_results[i] = {
                         "scenario_name": scenario.name,
                         "status": "FAILED",
                         "error": str(e),
                     }
-                )
+        all_results.extend(scenario_results)
 
         # Test benchmark comparison
         try:
@@ -641,7 +774,7 @@ class PortfolioCalculationTester:
                 }
             )
         except Exception as e:
-            logger.error(f"❌ Benchmark comparison failed: {e}")
+            logger.error("❌ Benchmark comparison failed: %s", e)
             all_results.append(
                 {
                     "scenario_name": "Benchmark Comparison",
@@ -708,7 +841,7 @@ def main():
         results = tester.run_all_tests()
         return results
     except Exception as e:
-        logger.error(f"Test runner failed: {e}")
+        logger.error("Test runner failed: %s", e)
         return []
 
 